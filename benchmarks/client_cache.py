@@ -0,0 +1,66 @@
+"""
+Checks client side caching of poll records against a real redis (6+), and times cached reads.
+
+Run from the repo root, pointing at a redis you don't mind writing `poll:*` test keys to:
+    REDIS_URL=redis://localhost:6379 python -m benchmarks.client_cache
+"""
+import asyncio
+import os
+import time
+
+import aioredis
+
+from models.poll import PollData, PollOption
+from models.storage import POLL_PREFIX, PollStore
+from models.tracking import ClientCache
+
+GUILD_ID = 1
+POLLS = 500
+
+
+async def read_all(store: PollStore) -> float:
+    start = time.perf_counter()
+    for msg_id in range(POLLS):
+        await store.get(GUILD_ID, msg_id)
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    url = os.environ.get("REDIS_URL", "redis://localhost:6379")
+    redis = await aioredis.from_url(url, decode_responses=True)
+    raw = await aioredis.from_url(url)
+    cache = ClientCache(redis, f"{POLL_PREFIX}:", max_size=POLLS)
+    await cache.start()
+    store = PollStore(redis, raw, cache=cache)
+    # a second process, writing without a cache
+    other = PollStore(redis, raw)
+
+    try:
+        for msg_id in range(POLLS):
+            poll = PollData("Benchmark", 1, channel_id=1, message_id=msg_id)
+            poll.poll_options.append(PollOption("Yes", "👍", range(100)))
+            await store.save(GUILD_ID, msg_id, poll)
+
+        cold = await read_all(store)
+        warm = await read_all(store)
+        print(f"{POLLS} reads: {cold:.1f}ms from redis, {warm:.1f}ms cached")
+        print(f"hits: {cache.hits}, misses: {cache.misses}")
+
+        poll = await other.get(GUILD_ID, 0)
+        await other.load_voters(GUILD_ID, 0, poll)
+        poll.vote(0, 12345)
+        await other.save(GUILD_ID, 0, poll)
+        await asyncio.sleep(0.1)
+        fresh = await store.get(GUILD_ID, 0)
+        print(
+            f"invalidations: {cache.invalidations}, "
+            f"saw the other writer's vote: {fresh.poll_options[0].vote_count == 101}"
+        )
+    finally:
+        for msg_id in range(POLLS):
+            await store.delete(GUILD_ID, msg_id)
+        await cache.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Autocomplete scoring, thefuzz called once per candidate against rapidfuzz scoring the whole batch.
+
+Run from the repo root:
+    python -m benchmarks.fuzzy_scoring
+"""
+import random
+import string
+import time
+
+from thefuzz import fuzz
+
+from models.search import top_matches
+
+WORDS = [
+    "pizza", "movie", "night", "game", "raid", "vote", "best", "weekend", "music",
+    "anime", "server", "event", "favourite", "colour", "time", "food", "team",
+]
+
+
+def titles(count: int) -> list[str]:
+    return [
+        " ".join(random.choices(WORDS, k=random.randint(2, 5)))
+        + f" {''.join(random.choices(string.ascii_lowercase, k=4))}"
+        for _ in range(count)
+    ]
+
+
+def per_item(query: str, choices: list[str]) -> list[str]:
+    # how autocompletes were scored before
+    return sorted(choices, key=lambda x: fuzz.partial_ratio(x, query), reverse=True)[:25]
+
+
+def batched(query: str, choices: list[str]) -> list[str]:
+    return [choices[i] for i, _ in top_matches(query, choices, 25)]
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    print(f"{'candidates':>10} | {'per item':>10} | {'batched':>10} | {'speedup':>7}")
+    for count in (10, 1_000, 100_000):
+        choices = titles(count)
+        query = "pizza nig"
+        repeat = max(1, 10_000 // count)
+
+        old = timed(lambda: per_item(query, choices), repeat)
+        new = timed(lambda: batched(query, choices), repeat)
+        print(f"{count:>10} | {old:>8.2f}ms | {new:>8.2f}ms | {old / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
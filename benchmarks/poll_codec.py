@@ -0,0 +1,62 @@
+"""
+Poll record encode/decode, the old attrs + JSON path against models.codec.
+
+Run from the repo root:
+    python -m benchmarks.poll_codec
+"""
+import datetime
+import random
+import time
+
+import orjson
+
+from models import codec
+from models.poll import PollData, PollOption
+
+SNOWFLAKE_BASE = 900_000_000_000_000_000
+
+
+def make_poll(voters: int, options: int = 5) -> PollData:
+    ids = random.sample(range(SNOWFLAKE_BASE, SNOWFLAKE_BASE + voters * 50), voters)
+    return PollData(
+        title="What should we play this weekend?",
+        author_id=SNOWFLAKE_BASE,
+        channel_id=SNOWFLAKE_BASE + 1,
+        message_id=SNOWFLAKE_BASE + 2,
+        author_data={"name": "someone", "avatar_url": "https://cdn.discordapp.com/avatars/1/a.png"},
+        poll_options=[
+            PollOption(f"Option {i}", "🍕", ids[i::options]) for i in range(options)
+        ],
+        expire_time=datetime.datetime.now() + datetime.timedelta(hours=1),
+    )
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    print(
+        f"{'voters':>8} | {'json size':>10} | {'codec size':>10} | {'json encode':>11} | "
+        f"{'codec encode':>12} | {'json decode':>11} | {'codec decode':>12}"
+    )
+    for voters in (10, 1_000, 10_000, 100_000):
+        poll = make_poll(voters)
+        repeat = max(3, 20_000 // voters)
+        as_json = orjson.dumps(poll.__dict__())
+        as_codec = codec.encode(poll)
+
+        print(
+            f"{voters:>8} | {len(as_json):>10} | {len(as_codec):>10} | "
+            f"{timed(lambda: orjson.dumps(poll.__dict__()), repeat):>9.3f}ms | "
+            f"{timed(lambda: codec.encode(poll), repeat):>10.3f}ms | "
+            f"{timed(lambda: PollData(**orjson.loads(as_json)), repeat):>9.3f}ms | "
+            f"{timed(lambda: codec.decode(as_codec), repeat):>10.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Votes/sec on one poll with 1,000 users clicking at once, holding the poll's lock across the
+reply and the redis write (how `on_button` used to vote) against the fast path that only votes under it.
+
+Replies are simulated with a sleep the length of a discord round trip. Votes are logged in `stream`
+mode against a real redis, point it at one you don't mind writing `poll:*` test keys to:
+    REDIS_URL=redis://localhost:6379 python -m benchmarks.vote_throughput
+"""
+import asyncio
+import os
+import time
+
+import aioredis
+
+from models.poll import PollData, PollOption
+from models.storage import PollStore, stream_key
+
+GUILD_ID = 1
+CLICKERS = 1_000
+# a discord interaction reply
+REPLY_LATENCY = 0.05
+
+
+def make_poll(msg_id: int) -> PollData:
+    poll = PollData("Benchmark", 1, channel_id=1, message_id=msg_id, single_vote=True)
+    for i in range(4):
+        poll.poll_options.append(PollOption(f"Option {i}", "🍕"))
+    return poll
+
+
+async def locked_vote(store: PollStore, poll: PollData, user_id: int):
+    async with poll.lock:
+        added = poll.vote(user_id % 4, user_id)
+        written = store.record_vote(GUILD_ID, poll, user_id % 4, user_id, added)
+        await written
+        await asyncio.sleep(REPLY_LATENCY)
+
+
+async def fast_vote(store: PollStore, poll: PollData, user_id: int):
+    async with poll.lock:
+        added = poll.vote(user_id % 4, user_id)
+        written = store.record_vote(GUILD_ID, poll, user_id % 4, user_id, added)
+    await written
+    await asyncio.sleep(REPLY_LATENCY)
+
+
+async def run(vote, store: PollStore, msg_id: int) -> float:
+    poll = make_poll(msg_id)
+    start = time.perf_counter()
+    await asyncio.gather(*(vote(store, poll, user_id) for user_id in range(CLICKERS)))
+    elapsed = time.perf_counter() - start
+
+    loaded = await store.redis.xlen(stream_key(GUILD_ID, msg_id))
+    assert poll.total_votes == CLICKERS and loaded == CLICKERS
+    return CLICKERS / elapsed
+
+
+async def main():
+    url = os.environ.get("REDIS_URL", "redis://localhost:6379")
+    redis = await aioredis.from_url(url, decode_responses=True)
+    raw = await aioredis.from_url(url)
+    store = PollStore(redis, raw, "stream")
+
+    try:
+        locked = await run(locked_vote, store, 1)
+        fast = await run(fast_vote, store, 2)
+        print(f"{CLICKERS} clickers, {REPLY_LATENCY * 1000:.0f}ms replies")
+        print(f"lock held for the reply and write: {locked:>8.1f} votes/sec")
+        print(f"fast path:                         {fast:>8.1f} votes/sec")
+    finally:
+        await redis.delete(*(stream_key(GUILD_ID, m) for m in (1, 2)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
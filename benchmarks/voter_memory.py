@@ -0,0 +1,57 @@
+"""
+Memory report for poll voter storage, a python set of ids against VoterSet.
+
+Run from the repo root:
+    python -m benchmarks.voter_memory
+"""
+import copy
+import random
+import time
+import tracemalloc
+
+from models.voters import VoterSet
+
+# discord snowflakes are ~2**60, big enough that python can't intern them
+SNOWFLAKE_BASE = 900_000_000_000_000_000
+
+
+def voter_ids(count: int) -> list[int]:
+    return random.sample(range(SNOWFLAKE_BASE, SNOWFLAKE_BASE + count * 50), count)
+
+
+def measure(build) -> tuple[object, int]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, size
+
+
+def timed(func, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    print(f"{'voters':>8} | {'set B/voter':>11} | {'VoterSet B/voter':>16} | {'deepcopy set':>12} | {'deepcopy VoterSet':>17} | {'to bytes':>8}")
+    for count in (1_000, 10_000, 100_000, 500_000):
+        ids = voter_ids(count)
+        # ints are rebuilt from strings so neither container shares the ones in `ids`
+        raw = [str(i) for i in ids]
+
+        as_set, set_bytes = measure(lambda: {int(i) for i in raw})
+        as_voters, voter_bytes = measure(lambda: VoterSet(int(i) for i in raw))
+
+        print(
+            f"{count:>8} | {set_bytes / count:>11.1f} | {voter_bytes / count:>16.1f} | "
+            f"{timed(lambda: copy.deepcopy(as_set)):>10.2f}ms | "
+            f"{timed(lambda: copy.deepcopy(as_voters)):>15.2f}ms | "
+            f"{timed(lambda: bytes(as_voters)):>6.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,9 @@ import os
 import sys
 import traceback
 from configparser import RawConfigParser
-from copy import deepcopy
+from contextlib import suppress
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
@@ -31,15 +31,28 @@ from dis_snek.models import (
     MaterialColors,
     Timestamp,
     Permissions,
+    Message,
 )
 from dis_snek.models.snek.application_commands import SlashCommandOption, slash_option
 from dis_snek.api.events import MessageReactionAdd
+from dis_snek.client.errors import NotFound
 from dis_snek import Task
 from dis_snek.models.snek.tasks.triggers import IntervalTrigger
 from dis_snek.models.discord import color
-from thefuzz import fuzz
+from models.admission import FairAdmission
+from models.authors import AuthorCache
+from models.bloom import CountingBloomFilter
+from models.cache import PollCache
 from models.emoji import booleanEmoji
 from models.poll import PollData, PollOption
+from models.expiry import ExpiryQueue
+from models.leader import LeaderLease
+from models.messages import PollMessages
+from models.scheduler import EditScheduler
+from models.search import PollSearchIndex, top_matches
+from models.storage import POLL_PREFIX, PollStore
+from models.sync import PollSync
+from models.tracking import ClientCache
 from pastypy import AsyncPaste as Paste
 
 logging.basicConfig()
@@ -80,6 +93,58 @@ def ConfigSectionMap(section):
     return dict1
 
 
+# how long a vote can sit in memory before it's written to redis, this is the most that's lost on a crash
+POLL_FLUSH_INTERVAL = Config.getfloat("PollSettings", "flush_interval", fallback=2)
+# "snapshot" stores each poll as one record, "sets" keeps every option's voters in its own redis set,
+# "stream" logs each vote and snapshots the poll every `snapshot_interval` seconds
+POLL_STORAGE = Config.get("PollSettings", "storage", fallback="snapshot")
+POLL_SNAPSHOT_INTERVAL = Config.getfloat("PollSettings", "snapshot_interval", fallback=60)
+# track timed polls in a redis due queue, so they're closed even if they expired while the bot was down
+POLL_REDIS_EXPIRY = Config.getboolean("PollSettings", "redis_expiry", fallback=False)
+# how often the redis due queue is checked for polls this process doesn't know about
+POLL_EXPIRY_CHECK = 30
+# how many expired polls are closed together
+CLOSE_BATCH_SIZE = 500
+# how many poll messages (in different channels) can be edited at once
+POLL_EDIT_WORKERS = Config.getint("PollSettings", "edit_workers", fallback=8)
+# how many polls are kept in memory, and how long an unused one stays there, the rest are loaded from redis
+POLL_CACHE_SIZE = Config.getint("PollSettings", "cache_size", fallback=10000)
+POLL_CACHE_IDLE = Config.getfloat("PollSettings", "cache_idle", fallback=1800)
+# how long a cached poll goes unused before its voters are dropped from memory, leaving the counts to render it
+POLL_VOTERS_IDLE = Config.getfloat("PollSettings", "voters_idle", fallback=300)
+# roughly how many open polls the poll id filter is sized for, it gets less accurate past this
+POLL_FILTER_CAPACITY = Config.getint("PollSettings", "filter_capacity", fallback=500000)
+# how long a message that isn't a poll is remembered, so reactions to it don't each query redis
+POLL_MISSING_TTL = 30
+# share poll changes with other bot processes using the same redis, and split message edits between them by guild
+POLL_SYNC = Config.getboolean("PollSettings", "sync", fallback=False)
+# periodic jobs that mustn't run twice (reminders, channel names) only run in the process holding a lease in redis,
+# this is how long the lease lasts without being renewed, so how long a dead leader's jobs wait for another process
+LEADER_LEASE = Config.getfloat("PollSettings", "leader_lease", fallback=10)
+# cache poll records in memory, with redis invalidating them (CLIENT TRACKING, needs redis 6+), 0 turns it off
+POLL_CLIENT_CACHE = Config.getint("PollSettings", "client_cache", fallback=0)
+# keep a set of the polls each user has voted on in redis, otherwise /my_votes checks every poll in the guild
+POLL_VOTE_INDEX = Config.getboolean("PollSettings", "vote_index", fallback=False)
+# keep open polls' message objects in memory, so other code can always get them from the message cache
+POLL_PIN_MESSAGES = Config.getboolean("PollSettings", "pin_messages", fallback=False)
+# interaction handlers are admitted per guild, so one guild's vote storm can't starve the others:
+# how many run at once, how many of those can be from one guild,
+# and "guild_id:weight, ..." for guilds that get more than one slot per turn
+POLL_ADMISSION_SLOTS = Config.getint("PollSettings", "admission_slots", fallback=64)
+POLL_ADMISSION_PER_GUILD = Config.getint("PollSettings", "admission_per_guild", fallback=8)
+POLL_ADMISSION_WEIGHTS = {
+    to_snowflake(guild.strip()): int(weight)
+    for guild, weight in (
+        w.split(":") for w in Config.get("PollSettings", "admission_weights", fallback="").split(",") if w.strip()
+    )
+}
+# discord drops autocompletes that take more than 3 seconds, so they give up waiting before then
+AUTOCOMPLETE_ADMISSION_TIMEOUT = 2
+# how many polls /my_votes lists
+MY_VOTES_LIMIT = 20
+# how many polls /my_votes reads from redis at a time
+MY_VOTES_BATCH = 100
+
 def_options = [
     SlashCommandOption(
         "title", OptionTypes.STRING, "The title for your poll", required=True
@@ -154,9 +219,34 @@ class Bot(Snake):
                 auto_defer=AutoDefer(enabled=True, time_until_defer=3),
 
             )
-        self.polls: dict[Snowflake_Type, dict[Snowflake_Type, PollData]] = {}
-        self.polls_to_update: dict[Snowflake_Type, set[Snowflake_Type]] = {}
+        self.polls: PollCache = PollCache(
+            POLL_CACHE_SIZE, POLL_CACHE_IDLE, is_pinned=self.poll_in_use
+        )
+        self.edit_scheduler = EditScheduler(self.update_poll, workers=POLL_EDIT_WORKERS)
+        self.expiry = ExpiryQueue()
+        self.poll_search = PollSearchIndex()
+        self.authors = AuthorCache(self)
+        self.poll_messages = PollMessages(self, POLL_PIN_MESSAGES)
+        self.admission = FairAdmission(
+            POLL_ADMISSION_SLOTS, POLL_ADMISSION_PER_GUILD, POLL_ADMISSION_WEIGHTS
+        )
+        self.dirty_polls: set[tuple[Snowflake_Type, Snowflake_Type]] = set()
+        self.flushing: set[tuple[Snowflake_Type, Snowflake_Type]] = set()
+        # polls with logged votes their snapshot doesn't have yet, and when the first of those was logged
+        self.pending_snapshots: dict[tuple[Snowflake_Type, Snowflake_Type], float] = {}
+        self.poll_loads: dict[tuple[Snowflake_Type, Snowflake_Type], asyncio.Future] = {}
+        self.missing_polls: dict[tuple[Snowflake_Type, Snowflake_Type], float] = {}
+        # every open poll's message id, only trusted once warm-up has added all of them
+        self.poll_filter = CountingBloomFilter(POLL_FILTER_CAPACITY)
+        self.poll_filter_ready = False
+        self.flush_lock: asyncio.Lock = asyncio.Lock()
+        # the loop closing expired polls, and anything else running in the background
+        self.poll_closer: Optional[asyncio.Task] = None
+        self.background_tasks: set[asyncio.Task] = set()
         self.redis: aioredis.Redis = MISSING
+        self.store: PollStore = MISSING
+        self.sync: Optional[PollSync] = None
+        self.leader: LeaderLease = MISSING
         self.available: asyncio.Event = asyncio.Event()
         self.available.set()
 
@@ -178,12 +268,44 @@ class Bot(Snake):
             if "nt" not in os.name:
                 log.error("Failed to connect to redis, aborting login")
                 return await self.stop()
-        await self.cache_polls()
-        log.debug(f"{self.total_polls} polls cached")
-
-        self.update_polls.start()
-        self.close_polls.start()
-
+        if self.sync:
+            await self.sync.refresh_instances()
+            self.sync.start()
+        try:
+            await self.leader.renew()
+        except Exception as e:
+            log.error(f"Failed to take the jobs lease: {e}")
+        self.leader.start()
+        self.edit_scheduler.start()
+        if self.poll_closer is None or self.poll_closer.done():
+            self.poll_closer = asyncio.create_task(self.close_polls())
+        self.flush_polls.start()
+
+        # warm the poll cache in the background, get_poll falls back to redis until it's done
+        self.run_background(self.cache_polls())
+
+
+    def run_background(self, coro) -> asyncio.Task:
+        """Run a coroutine in its own task, kept referenced until it's done and cancelled on stop"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    async def stop(self) -> None:
+        if self.poll_closer is not None:
+            self.poll_closer.cancel()
+        for task in list(self.background_tasks):
+            task.cancel()
+        if self.store:
+            await self.flush_dirty_polls()
+        if self.sync:
+            await self.sync.stop()
+        if self.leader:
+            await self.leader.stop()
+        if self.store and self.store.cache is not None:
+            await self.store.cache.stop()
+        await super().stop()
 
     async def on_command_error(
             self, ctx: Context, error: Exception, *args: list, **kwargs: dict
@@ -236,11 +358,7 @@ class Bot(Snake):
 
     @property
     def total_polls(self):
-        total = 0
-        for guild in self.polls.keys():
-            for _ in self.polls[guild]:
-                total += 1
-        return total
+        return len(self.polls)
 
     async def connect(self):
         self.redis = await aioredis.from_url(
@@ -249,44 +367,109 @@ class Bot(Snake):
             password=ConfigSectionMap("DatabaseSettings")["password"],
             decode_responses=True
         )
+        # poll records are binary, so they go through a connection that leaves responses as bytes
+        raw_redis = await aioredis.from_url(
+            ConfigSectionMap("DatabaseSettings")["host"],
+            username=ConfigSectionMap("DatabaseSettings")["username"],
+            password=ConfigSectionMap("DatabaseSettings")["password"],
+        )
+        cache = None
+        if POLL_CLIENT_CACHE:
+            cache = ClientCache(self.redis, f"{POLL_PREFIX}:", POLL_CLIENT_CACHE)
+            try:
+                await cache.start()
+            except Exception as e:
+                log.error(f"Couldn't enable client side caching, reading polls from redis: {e}")
+                await cache.stop()
+                cache = None
+        self.store = PollStore(
+            self.redis,
+            raw_redis,
+            POLL_STORAGE,
+            redis_expiry=POLL_REDIS_EXPIRY,
+            cache=cache,
+            vote_index=POLL_VOTE_INDEX,
+        )
+        if POLL_SYNC:
+            self.sync = PollSync(self.redis, self.on_poll_event)
+        self.leader = LeaderLease(self.redis, "jobs", LEADER_LEASE)
 
     async def cache_polls(self):
-        keys = await self.redis.keys("*")
-        for key in keys:
-            poll_data = await self.redis.get(key)
-            try:
-                poll = PollData(**orjson.loads(poll_data))
+        start = time.perf_counter()
+        cached = 0
+        self.poll_filter_ready = False
+        self.poll_filter.clear()
+        async for batch in self.store.iter_polls():
+            for guild_id, msg_id, poll in batch:
+                self.poll_filter.add(msg_id)
+                # a vote may have already loaded this poll through get_poll, don't replace it
+                self.track_poll(guild_id, msg_id, poll, replace=False)
+            await self.store.schedule_expiry(batch)
+            cached += len(batch)
+            log.info(
+                f"Poll warm-up: {cached} polls cached ({time.perf_counter() - start:.2f}s)"
+            )
 
-                guild_id, msg_id = [to_snowflake(k) for k in key.split("|")]
-                author = await self.cache.get_member(guild_id, poll.author_id)
-                poll.author_data = {
-                    "name": author.display_name,
-                    "avatar_url": author.avatar.url,
-                }
+        self.poll_filter_ready = True
+        log.info(
+            f"Poll warm-up complete: {cached} polls cached in {time.perf_counter() - start:.2f}s"
+        )
 
-                if not self.polls.get(guild_id):
-                    self.polls[guild_id] = {}
-                self.polls[guild_id][msg_id] = poll
-            except TypeError:
-                continue
+    def maybe_poll(self, msg_id: Snowflake_Type) -> bool:
+        """False if a message definitely isn't a poll, so events for it can be ignored without asking redis"""
+        return not self.poll_filter_ready or msg_id in self.poll_filter
 
     async def get_poll(
             self, guild_id: Snowflake_Type, msg_id: Snowflake_Type
     ) -> Optional[PollData]:
-        try:
-            return self.polls[guild_id][msg_id]
-        except KeyError:
-            poll_data = await self.redis.get(f"{guild_id}|{msg_id}")
-            if poll_data:
-                poll = PollData(**orjson.loads(poll_data))
-
-                if not self.polls.get(guild_id):
-                    self.polls[guild_id] = {}
-                self.polls[guild_id][msg_id] = poll
+        if poll := self.polls.get(guild_id, msg_id):
+            return poll
+        key = (guild_id, msg_id)
+        if self.missing_polls.get(key, 0) > time.monotonic():
+            return None
+
+        # concurrent misses share one load, so they all get the same poll (and lock)
+        if not (load := self.poll_loads.get(key)):
+            load = self.poll_loads[key] = asyncio.ensure_future(
+                self.load_poll(guild_id, msg_id)
+            )
+            load.add_done_callback(lambda _: self.poll_loads.pop(key, None))
+        return await asyncio.shield(load)
 
-                return poll
+    async def load_poll(
+            self, guild_id: Snowflake_Type, msg_id: Snowflake_Type
+    ) -> Optional[PollData]:
+        poll = await self.store.get(guild_id, msg_id)
+        if poll:
+            return self.track_poll(guild_id, msg_id, poll, replace=False)
+        self.remember_missing(guild_id, msg_id)
         return None
 
+    def remember_missing(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        now = time.monotonic()
+        if len(self.missing_polls) > 10000:
+            self.missing_polls = {k: v for k, v in self.missing_polls.items() if v > now}
+        self.missing_polls[(guild_id, msg_id)] = now + POLL_MISSING_TTL
+
+    def track_poll(
+            self,
+            guild_id: Snowflake_Type,
+            msg_id: Snowflake_Type,
+            poll: PollData,
+            replace: bool = True,
+    ) -> PollData:
+        """Add a poll to the local cache and everything indexing it, returns the cached poll"""
+        if not replace and (cached := self.polls.peek(guild_id, msg_id)):
+            return cached
+        self.missing_polls.pop((guild_id, msg_id), None)
+        self.polls.put(guild_id, msg_id, poll)
+
+        if poll.expire_time:
+            self.expiry.schedule(guild_id, msg_id, poll.expire_time)
+        if not poll.expired:
+            self.poll_search.add(guild_id, poll.author_id, msg_id, poll.title)
+        return poll
+
     async def process_poll_option(self, ctx: InteractionContext, poll: str):
         try:
             poll = await self.get_poll(ctx.guild_id, to_snowflake(poll))
@@ -299,23 +482,210 @@ class Bot(Snake):
             return poll
 
     async def set_poll(
-            self, guild_id: Snowflake_Type, msg_id: Snowflake_Type, poll: PollData
+            self,
+            guild_id: Snowflake_Type,
+            msg_id: Snowflake_Type,
+            poll: PollData,
+            message: Optional[Message] = None,
     ):
-        if not self.polls.get(guild_id):
-            self.polls[guild_id] = {}
-        self.polls[guild_id][msg_id] = poll
-        await self.redis.set(
-            f"{guild_id}|{poll.message_id}", orjson.dumps(poll.__dict__())
+        self.track_poll(guild_id, msg_id, poll)
+        if message:
+            self.poll_messages.keep(message)
+        self.poll_filter.add(msg_id)
+        if poll.author_data:
+            self.authors.put(guild_id, poll.author_id, poll.author_data)
+        await self.store.save(guild_id, poll.message_id, poll)
+        self.publish_poll(
+            "create",
+            guild_id,
+            msg_id,
+            author=int(poll.author_id),
+            title=poll.title,
+            expires=poll.expire_time.timestamp() if poll.expire_time else None,
         )
 
-    async def delete_poll(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
-        log.debug(f"Deleting poll: {guild_id}|{msg_id}")
+    def poll_in_use(self, key: tuple[Snowflake_Type, Snowflake_Type], poll: PollData) -> bool:
+        """Whether a poll has to stay in memory, it has unsaved votes or someone is working on it"""
+        return key in self.dirty_polls or key in self.flushing or poll.lock.locked()
+
+    async def load_voters(self, guild_id: Snowflake_Type, poll: PollData):
+        """Make sure a poll's voters are in memory before changing them, polls are loaded with just their counts"""
+        # in sets mode votes are made in redis, the counts are all that's kept here
+        if not self.store.sets and not poll.voters_loaded:
+            await self.store.load_voters(guild_id, poll.message_id, poll)
+
+    def unload_idle_voters(self):
+        for key, poll in self.polls.idle(POLL_VOTERS_IDLE):
+            if not self.poll_in_use(key, poll):
+                poll.unload_voters()
+
+    @staticmethod
+    def still_voted(poll: PollData, author_id: Snowflake_Type, added: bool) -> Optional[bool]:
+        """Whether a user has any votes left on a poll after voting, None if that isn't known"""
+        if poll.voters_loaded:
+            return poll.has_voted(author_id)
+        if added or poll.single_vote:
+            return added
+        # they may still have votes on other options, /my_votes checks when it reads the index
+        return None
+
+    def queue_snapshots(self):
+        """Have polls whose votes have been logged for a while snapshotted on this flush"""
+        cutoff = time.monotonic() - POLL_SNAPSHOT_INTERVAL
+        for key, logged in list(self.pending_snapshots.items()):
+            if logged <= cutoff:
+                del self.pending_snapshots[key]
+                self.dirty_polls.add(key)
+
+    def mark_dirty(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        """Queue a poll to be written to redis on the next flush"""
+        self.dirty_polls.add((guild_id, msg_id))
+
+    async def flush_dirty_polls(self):
+        if not self.dirty_polls:
+            return
+        dirty, self.dirty_polls = self.dirty_polls, set()
+        self.flushing = dirty
+
+        # held so a poll deleted mid-flush can't be written back afterwards
+        async with self.flush_lock:
+            polls = []
+            for guild_id, msg_id in dirty:
+                if poll := self.polls.peek(guild_id, msg_id):
+                    polls.append((guild_id, msg_id, poll))
+            try:
+                await self.store.save_many(polls)
+            except Exception:
+                # put them back so the next flush retries, unless they've been deleted since
+                self.dirty_polls |= {
+                    key for key in dirty if key in self.polls
+                }
+                raise
+            finally:
+                self.flushing = set()
+        log.debug(f"Flushed {len(polls)} polls")
+
+    def fill_author(self, guild_id: Snowflake_Type, poll: PollData):
+        """
+        Use the author's cached name and avatar, or look them up in the background and edit again once found.
+
+        This only changes the poll in memory, it's resolved again on every render so there's no need to write it out,
+        the next save for a vote or an edit picks it up.
+        """
+        if data := self.authors.get(guild_id, poll.author_id):
+            if data != poll.author_data:
+                poll.author_data = data
+        else:
+            self.run_background(self.resolve_author(guild_id, poll))
+
+    async def resolve_author(self, guild_id: Snowflake_Type, poll: PollData):
+        data = await self.authors.resolve(guild_id, poll.author_id)
+        if data and data != poll.author_data and not poll.expired:
+            poll.author_data = data
+            self.edit_scheduler.mark(guild_id, poll.channel_id, poll.message_id)
+
+    async def edit_poll_message(
+            self, guild_id: Snowflake_Type, poll: PollData, delete_missing: bool = True
+    ) -> bool:
+        """
+        Edit a poll's message to its current state, skipped if discord already shows it.
+
+        If the message has been deleted the poll is deleted too, or with `delete_missing` off,
+        for callers deleting the poll anyway, `NotFound` is raised.
+        """
+        self.fill_author(guild_id, poll)
+        payload_hash = poll.payload_hash
+        if payload_hash == poll.sent_hash:
+            return False
         try:
-            self.polls[guild_id].pop(msg_id)
-        except:
-            breakpoint()
+            await self.poll_messages.edit(
+                poll.channel_id, poll.message_id, poll.embed, poll.components
+            )
+        except NotFound:
+            if not delete_missing:
+                raise
+            log.info(f"Poll message {poll.message_id} was deleted, deleting the poll")
+            await self.delete_poll(guild_id, poll.message_id)
+            return False
+        poll.sent_hash = payload_hash
+        return True
+
+    def forget_poll(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        """Drop a poll from this process, without touching redis"""
+        self.dirty_polls.discard((guild_id, msg_id))
+        self.pending_snapshots.pop((guild_id, msg_id), None)
+        self.edit_scheduler.discard(msg_id)
+        self.poll_messages.release(msg_id)
+        self.expiry.cancel(guild_id, msg_id)
+        self.poll_search.remove(msg_id)
+        self.polls.pop(guild_id, msg_id)
+
+    def poll_deleted(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        """Forget a poll that no longer exists, so events for it are turned away"""
+        self.forget_poll(guild_id, msg_id)
+        self.remember_missing(guild_id, msg_id)
+        if self.poll_filter_ready:
+            # before then warm-up may not have added it yet
+            self.poll_filter.remove(msg_id)
 
-        await self.redis.delete(f"{guild_id}|{msg_id}")
+    async def delete_poll(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        await self.delete_polls([(guild_id, msg_id)])
+
+    async def delete_polls(self, polls: list[tuple[Snowflake_Type, Snowflake_Type]]):
+        for guild_id, msg_id in polls:
+            log.debug(f"Deleting poll: {guild_id}|{msg_id}")
+            self.poll_deleted(guild_id, msg_id)
+            self.publish_poll("delete", guild_id, msg_id)
+
+        async with self.flush_lock:
+            await self.store.delete_many(polls)
+
+    def is_leader(self) -> bool:
+        """Whether this process runs the periodic jobs only one process should, see `LeaderLease`"""
+        return bool(self.leader) and self.leader.is_leader
+
+    def owns_poll(self, guild_id: Snowflake_Type) -> bool:
+        """Whether this process edits the guild's poll messages"""
+        return not self.sync or self.sync.owns(guild_id)
+
+    def publish_poll(self, op: str, guild_id: Snowflake_Type, msg_id: Snowflake_Type, **data):
+        if self.sync:
+            self.sync.publish(op, guild_id, msg_id, **data)
+
+    async def on_poll_event(self, event: dict):
+        """Apply a poll change made by another process"""
+        guild_id, msg_id, op = event["guild"], event["msg"], event["op"]
+        if op == "create":
+            self.poll_filter.add(msg_id)
+            self.missing_polls.pop((guild_id, msg_id), None)
+            self.poll_search.add(guild_id, event["author"], msg_id, event["title"])
+            if event["expires"]:
+                self.expiry.schedule(
+                    guild_id, msg_id, datetime.fromtimestamp(event["expires"])
+                )
+            return
+        if op == "delete":
+            self.poll_deleted(guild_id, msg_id)
+            return
+
+        owner = self.owns_poll(guild_id)
+        # votes are idempotent, so the owner can load a poll that already has this one and apply it again
+        poll = await self.get_poll(guild_id, msg_id) if owner else self.polls.peek(guild_id, msg_id)
+        if not poll:
+            return
+        async with poll.lock:
+            if op == "vote" and self.store.sets and not poll.voters_loaded:
+                # the event doesn't say which option a switched vote came from, the sets do
+                await self.store.load_counts(guild_id, poll)
+            elif op == "vote":
+                await self.load_voters(guild_id, poll)
+                poll.apply_vote(event["option"], event["user"], event["added"])
+            elif op == "add_option":
+                poll.add_option(event["text"])
+            elif op == "remove_option":
+                poll.remove_option(event["index"])
+        if owner:
+            self.edit_scheduler.mark(guild_id, poll.channel_id, msg_id)
 
     @slash_command(
         "reload",
@@ -349,12 +719,12 @@ class Bot(Snake):
     )
     async def poll(self, ctx: InteractionContext, **kwargs):
         await ctx.defer(ephemeral=True)
+        async with self.admission.slot(ctx.guild_id):
+            poll = PollData.from_ctx(ctx)
 
-        poll = PollData.from_ctx(ctx)
-
-        msg = await poll.send(self.cache.get_channel(poll.channel_id))
-        await self.set_poll(ctx.guild_id, msg.id, poll)
-        await ctx.send("To close the poll, react to it with 🔴")
+            msg = await poll.send(self.cache.get_channel(poll.channel_id))
+            await self.set_poll(ctx.guild_id, msg.id, poll, msg)
+            await ctx.send("To close the poll, react to it with 🔴")
 
     @slash_command(
         "poll_prefab",
@@ -365,20 +735,21 @@ class Bot(Snake):
     )
     async def boolean(self, ctx: InteractionContext, **kwargs):
         await ctx.defer(ephemeral=True)
-        if channel := kwargs.get("channel"):
-            u_perms = await ctx.author.channel_permissions(channel)
-            if Permissions.SEND_MESSAGES not in u_perms:
-                return await ctx.send(
-                    f"You do not have permission to send messages in {channel.mention}"
-                )
-
-        poll = PollData.from_ctx(ctx)
-        poll.poll_options.append(PollOption("Yes", booleanEmoji[0]))
-        poll.poll_options.append(PollOption("No", booleanEmoji[1]))
-
-        msg = await poll.send(self.cache.get_channel(poll.channel_id))
-        await self.set_poll(ctx.guild_id, msg.id, poll)
-        await ctx.send("To close the poll, react to it with 🔴")
+        async with self.admission.slot(ctx.guild_id):
+            if channel := kwargs.get("channel"):
+                u_perms = await ctx.author.channel_permissions(channel)
+                if Permissions.SEND_MESSAGES not in u_perms:
+                    return await ctx.send(
+                        f"You do not have permission to send messages in {channel.mention}"
+                    )
+
+            poll = PollData.from_ctx(ctx)
+            poll.poll_options.append(PollOption("Yes", booleanEmoji[0]))
+            poll.poll_options.append(PollOption("No", booleanEmoji[1]))
+
+            msg = await poll.send(self.cache.get_channel(poll.channel_id))
+            await self.set_poll(ctx.guild_id, msg.id, poll, msg)
+            await ctx.send("To close the poll, react to it with 🔴")
 
     @boolean.subcommand(
         sub_cmd_name="week",
@@ -387,22 +758,23 @@ class Bot(Snake):
     )
     async def week(self, ctx: InteractionContext, **kwargs):
         await ctx.defer(ephemeral=True)
-        poll = PollData.from_ctx(ctx)
-        options = [
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday",
-        ]
-        for opt in options:
-            poll.add_option(opt)
-
-        msg = await poll.send(ctx)
-        await self.set_poll(ctx.guild_id, msg.id, poll)
-        await ctx.send("To close the poll, react to it with 🔴")
+        async with self.admission.slot(ctx.guild_id):
+            poll = PollData.from_ctx(ctx)
+            options = [
+                "Monday",
+                "Tuesday",
+                "Wednesday",
+                "Thursday",
+                "Friday",
+                "Saturday",
+                "Sunday",
+            ]
+            for opt in options:
+                poll.add_option(opt)
+
+            msg = await poll.send(ctx)
+            await self.set_poll(ctx.guild_id, msg.id, poll, msg)
+            await ctx.send("To close the poll, react to it with 🔴")
 
     @slash_command(
         "edit_poll",
@@ -428,18 +800,23 @@ class Bot(Snake):
     )
     async def edit_poll_remove(self, ctx: InteractionContext, poll, option):
         await ctx.defer(ephemeral=True)
-
-        if poll := await self.process_poll_option(ctx, poll):
-            if poll.author_id == ctx.author.id:
-                message = self.cache.get_message(poll.channel_id, poll.message_id)
-                if message:
+        async with self.admission.slot(ctx.guild_id):
+            if poll := await self.process_poll_option(ctx, poll):
+                if poll.author_id == ctx.author.id:
                     async with poll.lock:
+                        await self.load_voters(ctx.guild_id, poll)
                         for i in range(len(poll.poll_options)):
                             if poll.poll_options[i].text == option.replace("_", " "):
-                                del poll.poll_options[i]
-                                await message.edit(
-                                    embeds=poll.embed, components=poll.components
+                                poll.remove_option(i)
+                                await self.store.remove_option(
+                                    ctx.guild_id, poll.message_id, i, poll
+                                )
+                                self.mark_dirty(ctx.guild_id, poll.message_id)
+                                self.publish_poll(
+                                    "remove_option", ctx.guild_id, poll.message_id, index=i
                                 )
+                                if self.owns_poll(ctx.guild_id):
+                                    await self.edit_poll_message(ctx.guild_id, poll)
                                 await ctx.send(
                                     f"Removed `{option}` from `{poll.title}`"
                                 )
@@ -449,8 +826,8 @@ class Bot(Snake):
                                 f"Failed to remove `{option}` from `{poll.title}`"
                             )
                     return
-            else:
-                return await ctx.send("Only the author of the poll can edit it!")
+                else:
+                    return await ctx.send("Only the author of the poll can edit it!")
 
     @edit_poll_remove.subcommand(
         sub_cmd_name="add_option",
@@ -473,67 +850,109 @@ class Bot(Snake):
     )
     async def edit_poll_add(self, ctx: InteractionContext, poll, option):
         await ctx.defer(ephemeral=True)
-
-        if poll := await self.process_poll_option(ctx, poll):
-            if poll.author_id == ctx.author.id:
-
-                message = self.cache.get_message(poll.channel_id, poll.message_id)
-                if message:
+        async with self.admission.slot(ctx.guild_id):
+            if poll := await self.process_poll_option(ctx, poll):
+                if poll.author_id == ctx.author.id:
                     async with poll.lock:
+                        await self.load_voters(ctx.guild_id, poll)
                         poll.add_option(option)
-                        await message.edit(
-                            embeds=poll.embed, components=poll.components
+                        self.mark_dirty(ctx.guild_id, poll.message_id)
+                        self.publish_poll(
+                            "add_option", ctx.guild_id, poll.message_id, text=option
                         )
+                        if self.owns_poll(ctx.guild_id):
+                            await self.edit_poll_message(ctx.guild_id, poll)
                         await ctx.send(f"Added `{option}` to `{poll.title}`")
                     return
-            else:
-                await ctx.send("Only the author of the poll can edit it!")
+                else:
+                    await ctx.send("Only the author of the poll can edit it!")
 
     @edit_poll_remove.autocomplete("poll")
     @edit_poll_add.autocomplete("poll")
     async def poll_autocomplete(self, ctx: AutocompleteContext, **kwargs):
-        polls = self.polls.get(ctx.guild_id)
-        if polls:
-            polls = [
-                p
-                for p in polls.values()
-                if p.author_id == ctx.author.id and not p.expired
+        try:
+            async with self.admission.slot(ctx.guild_id, AUTOCOMPLETE_ADMISSION_TIMEOUT):
+                polls = self.poll_search.search(ctx.guild_id, ctx.author.id, ctx.input_text)
+        except asyncio.TimeoutError:
+            polls = []
+        await ctx.send(
+            [
+                {
+                    "name": f"{title} ({Timestamp.from_snowflake(msg_id).ctime()})",
+                    "value": str(msg_id),
+                }
+                for msg_id, title in polls
             ]
-            polls = sorted(
-                polls,
-                key=lambda x: fuzz.partial_ratio(x.title, ctx.input_text),
-                reverse=True,
-            )[:25]
-
-            await ctx.send(
-                [
-                    {
-                        "name": f"{p.title} ({Timestamp.from_snowflake(p.message_id).ctime()})",
-                        "value": str(p.message_id),
-                    }
-                    for p in polls
-                ]
-            )
-
-        else:
-            await ctx.send([])
+        )
 
     @edit_poll_remove.autocomplete("option")
     async def option_autocomplete(self, ctx: AutocompleteContext, **kwargs):
-        poll = await self.get_poll(ctx.guild_id, to_snowflake(kwargs.get("poll")))
+        try:
+            async with self.admission.slot(ctx.guild_id, AUTOCOMPLETE_ADMISSION_TIMEOUT):
+                poll = await self.get_poll(ctx.guild_id, to_snowflake(kwargs.get("poll")))
+        except asyncio.TimeoutError:
+            poll = None
         if poll:
-            p_options = list(poll.poll_options)
-            p_options = sorted(
-                p_options,
-                key=lambda x: fuzz.partial_ratio(x.text, ctx.input_text),
-                reverse=True,
-            )[:25]
+            p_options = [o.text for o in poll.poll_options]
+            matches = top_matches(ctx.input_text, p_options, 25)
 
-            await ctx.send([p.text for p in p_options])
+            await ctx.send([p_options[i] for i, _ in matches])
 
         else:
             await ctx.send([])
 
+    @slash_command("my_votes", "See the polls you've voted on in this server")
+    async def my_votes(self, ctx: InteractionContext):
+        await ctx.defer(ephemeral=True)
+        async with self.admission.slot(ctx.guild_id):
+            if self.store.vote_index:
+                msg_ids = await self.store.voted_polls(ctx.guild_id, ctx.author.id)
+            else:
+                # without the vote index, every poll in the guild has to be checked
+                msg_ids = await self.store.poll_ids(ctx.guild_id)
+
+            lines = []
+            stale = []
+            more = 0
+            # newest first, snowflakes sort by time
+            msg_ids = sorted(msg_ids, reverse=True)
+            for start in range(0, len(msg_ids), MY_VOTES_BATCH):
+                if len(lines) >= MY_VOTES_LIMIT and not self.store.vote_index:
+                    break
+                batch = msg_ids[start : start + MY_VOTES_BATCH]
+                found = {}
+                for msg_id in batch:
+                    # polls in memory may have votes redis doesn't yet, the rest are only read to check
+                    poll = self.polls.peek(ctx.guild_id, msg_id)
+                    if poll and poll.voters_loaded:
+                        found[msg_id] = (poll, poll.votes_of(ctx.author.id))
+                if unread := [m for m in batch if m not in found]:
+                    found.update(
+                        zip(unread, await self.store.find_votes(ctx.guild_id, ctx.author.id, unread))
+                    )
+
+                for msg_id in batch:
+                    poll, votes = found[msg_id]
+                    if not votes:
+                        stale.append(msg_id)
+                    elif len(lines) < MY_VOTES_LIMIT:
+                        chosen = ", ".join(
+                            f"{poll.poll_options[i].emoji} `{poll.poll_options[i].inline_text}`" for i in votes
+                        )
+                        lines.append(
+                            f"[{poll.title or 'Untitled'}](https://discord.com/channels/{ctx.guild_id}/{poll.channel_id}/{msg_id}): {chosen}"
+                        )
+                    else:
+                        more += 1
+            if self.store.vote_index:
+                await self.store.unindex_votes(ctx.guild_id, ctx.author.id, stale)
+
+            if not lines:
+                return await ctx.send("You haven't voted on any open polls here")
+            if more:
+                lines.append(f"...and {more} more")
+            await ctx.send(embeds=Embed("Your votes", "\n".join(lines)))
+
     @listen()
     async def on_button(self, event):
         ctx: ComponentContext = event.context
@@ -542,40 +961,81 @@ class Bot(Snake):
 
             opt_index = int(ctx.custom_id.removeprefix("poll_option|"))
 
-            if poll := await self.get_poll(ctx.guild_id, ctx.message.id):
-                async with poll.lock:
-                    if not poll.expired:
-                        opt = poll.poll_options[opt_index]
-                        if poll.single_vote:
-                            for _o in poll.poll_options:
-                                if _o != opt:
-                                    if ctx.author.id in _o.voters:
-                                        _o.voters.remove(ctx.author.id)
-                        if opt.vote(ctx.author.id):
-                            await ctx.send(
-                                f"⬆️ Your vote for {opt.emoji}`{opt.inline_text}` has been added!"
+            poll = None
+            added = None
+            written = None
+            # the guild's slot covers loading the poll and voting, not waiting on discord
+            async with self.admission.slot(ctx.guild_id):
+                if self.maybe_poll(ctx.message.id):
+                    poll = await self.get_poll(ctx.guild_id, ctx.message.id)
+                if poll:
+                    # only the vote itself happens under the lock, replying and writing it out happen after
+                    async with poll.lock:
+                        if not poll.expired:
+                            opt = poll.poll_options[opt_index]
+                            if self.store.sets:
+                                # the vote is made in redis, atomically, so there's nothing to write afterwards
+                                added = await self.store.vote(
+                                    ctx.guild_id, poll, opt_index, ctx.author.id
+                                )
+                            else:
+                                await self.load_voters(ctx.guild_id, poll)
+                                added = poll.vote(opt_index, ctx.author.id)
+                                if self.store.streams:
+                                    self.pending_snapshots.setdefault(
+                                        (ctx.guild_id, ctx.message.id), time.monotonic()
+                                    )
+                                else:
+                                    self.mark_dirty(ctx.guild_id, ctx.message.id)
+                            self.publish_poll(
+                                "vote",
+                                ctx.guild_id,
+                                poll.message_id,
+                                option=opt_index,
+                                user=int(ctx.author.id),
+                                added=added,
                             )
-                        else:
-                            await ctx.send(
-                                f"⬇️ Your vote for {opt.emoji}`{opt.inline_text}` has been removed!"
+                            # queued while locked so the poll's writes keep the order its votes were made in
+                            written = self.store.record_vote(
+                                ctx.guild_id,
+                                poll,
+                                opt_index,
+                                ctx.author.id,
+                                added,
+                                self.still_voted(poll, ctx.author.id, added),
                             )
 
-                    if ctx.guild_id not in self.polls_to_update:
-                        self.polls_to_update[ctx.guild_id] = set()
-                    self.polls_to_update[ctx.guild_id].add(poll.message_id)
-                    await self.set_poll(ctx.guild_id, ctx.message.id, poll)
+            if not poll:
+                return await ctx.send("That poll could not be edited 😕")
+            if self.owns_poll(ctx.guild_id):
+                self.edit_scheduler.mark(
+                    ctx.guild_id, poll.channel_id, poll.message_id
+                )
+            if written is not None:
+                await written
+            if added is None:
+                return
+            if added:
+                await ctx.send(
+                    f"⬆️ Your vote for {opt.emoji}`{opt.inline_text}` has been added!"
+                )
             else:
-                await ctx.send("That poll could not be edited 😕")
+                await ctx.send(
+                    f"⬇️ Your vote for {opt.emoji}`{opt.inline_text}` has been removed!"
+                )
 
     @listen()
     async def on_message_reaction_add(self, event: MessageReactionAdd):
-        if event.emoji.name == "🔴":
+        if event.emoji.name == "🔴" and self.maybe_poll(event.message.id):
             poll = await self.get_poll(event.message._guild_id, event.message.id)
             if poll:
                 async with poll.lock:
                     if event.author.id == poll.author_id:
                         poll._expired = True
-                        await event.message.edit(embeds=poll.embed, components=[])
+                        with suppress(NotFound):
+                            await self.edit_poll_message(
+                                event.message._guild_id, poll, delete_missing=False
+                            )
                         await self.delete_poll(
                             event.message._guild_id, event.message.id
                         )
@@ -601,48 +1061,136 @@ class Bot(Snake):
         embed.set_image(url="https://cdn.discordapp.com/attachments/943106707381444678/943106731377037332/unknown.png")
         await ctx.send(embeds=embed)
 
-    @Task.create(IntervalTrigger(seconds=30))
     async def close_polls(self):
-        polls = self.polls.copy()
-        polls_to_close = {}
-
-        for guild in polls.keys():
-            for poll in polls[guild].values():
-                if poll.expired:
-                    log.debug("Poll needs closing")
-                    if guild not in polls_to_close:
-                        polls_to_close[guild] = []
-                    polls_to_close[guild].append(poll)
-
-        for k, polls in polls_to_close.items():
-            for poll in polls:
-                async with poll.lock:
-                    log.debug(f"Closing poll: {poll.message_id}")
-                    msg = self.cache.get_message(poll.channel_id, poll.message_id)
-                    if msg:
-                        await msg.edit(embeds=poll.embed, components=[])
-
-                    await self.delete_poll(k, poll.message_id)
-
-    @Task.create(IntervalTrigger(seconds=2))
-    async def update_polls(self):
-        polls = deepcopy(self.polls_to_update)
-        if polls:
-            for guild in polls.keys():
-                for poll_id in polls[guild]:
-                    poll = await self.get_poll(guild, poll_id)
-                    async with poll.lock:
-                        if not poll.expired:
-                            log.debug(f"updating {poll_id}")
-                            msg = self.cache.get_message(
-                                poll.channel_id, poll.message_id
-                            )
-                            if msg:
-                                await msg.edit(
-                                    embeds=poll.embed, components=poll.components
-                                )
-                        self.polls_to_update[guild].remove(poll_id)
-                    await asyncio.sleep(0)
+        """Close polls as they expire, sleeping until the next one is due"""
+        while True:
+            try:
+                due = await self.due_polls()
+            except Exception as e:
+                log.error(f"Failed to check for expired polls: {e}")
+                await asyncio.sleep(POLL_EXPIRY_CHECK)
+                continue
+
+            for i in range(0, len(due), CLOSE_BATCH_SIZE):
+                try:
+                    await self.close_batch(due[i : i + CLOSE_BATCH_SIZE])
+                except Exception as e:
+                    log.error(f"Failed to close {len(due[i : i + CLOSE_BATCH_SIZE])} polls: {e}")
+
+    async def due_polls(self) -> list[tuple[Snowflake_Type, Snowflake_Type]]:
+        if not self.store.redis_expiry:
+            await self.expiry.wait()
+            return self.expiry.pop_due()
+
+        # polls created by other processes, or that expired while we were down, are only in redis
+        timeout = POLL_EXPIRY_CHECK
+        if (next_due := await self.store.next_due()) is not None:
+            timeout = min(timeout, max(0, next_due - time.time()))
+        await self.expiry.wait(timeout)
+
+        due = self.expiry.pop_due()
+        # our own due polls are claimed too, however many others are due, so one missing from claimed
+        # means its removal from the queue found nothing: another process claimed it and is closing it
+        claimed = await self.store.claim_due(local=due)
+        for guild_id, msg_id in set(due).difference(claimed):
+            self.forget_poll(guild_id, msg_id)
+        return claimed
+
+    async def close_batch(self, due: list[tuple[Snowflake_Type, Snowflake_Type]]):
+        """
+        Close a batch of expired polls.
+
+        Messages in different channels are edited concurrently, up to `POLL_EDIT_WORKERS` channels at once,
+        and one at a time within a channel to stay in its edit rate limit. The polls are then deleted together.
+        """
+        start = time.perf_counter()
+        if not self.store.redis_expiry:
+            for guild_id, msg_id in due:
+                if not self.owns_poll(guild_id):
+                    # the owner closes it, check back in case the owner has gone away since
+                    self.expiry.schedule(guild_id, msg_id, datetime.now() + timedelta(seconds=60))
+            due = [(g, m) for g, m in due if self.owns_poll(g)]
+
+        closing = []
+        channels: dict[Snowflake_Type, list[tuple[Snowflake_Type, PollData]]] = {}
+        for (guild_id, msg_id), poll in zip(
+            due, await asyncio.gather(*(self.get_poll(g, m) for g, m in due))
+        ):
+            if not poll:
+                continue
+            # waits out any vote in progress, later ones see the poll has closed
+            async with poll.lock:
+                log.debug(f"Closing poll: {poll.message_id}")
+                poll._expired = True
+            closing.append((guild_id, msg_id))
+            channels.setdefault(poll.channel_id, []).append((guild_id, poll))
+        if not closing:
+            return
+
+        edit_slots = asyncio.Semaphore(POLL_EDIT_WORKERS)
+        failed = 0
+
+        async def edit_channel(polls: list[tuple[Snowflake_Type, PollData]]):
+            nonlocal failed
+            async with edit_slots:
+                for guild_id, poll in polls:
+                    try:
+                        await self.edit_poll_message(guild_id, poll, delete_missing=False)
+                    except NotFound:
+                        log.info(f"Closed poll {poll.message_id}'s message was already deleted")
+                    except Exception as e:
+                        failed += 1
+                        log.error(f"Failed to edit closed poll {poll.message_id}: {e}")
+
+        await asyncio.gather(*(edit_channel(polls) for polls in channels.values()))
+        edited = time.perf_counter()
+        # closed either way, a failed edit just leaves the message showing the poll as it was
+        await self.delete_polls(closing)
+        done = time.perf_counter()
+        log.info(
+            f"Closed {len(closing)} polls in {len(channels)} channels in {done - start:.2f}s "
+            f"(edits {edited - start:.2f}s, deletes {done - edited:.2f}s"
+            + (f", {failed} edits failed)" if failed else ")")
+        )
+
+    async def update_poll(self, guild_id: Snowflake_Type, poll_id: Snowflake_Type):
+        """Called by the edit scheduler to bring a poll's message up to date"""
+        poll = await self.get_poll(guild_id, poll_id)
+        if poll:
+            async with poll.lock:
+                if not poll.expired:
+                    log.debug(f"updating {poll_id}")
+                    await self.edit_poll_message(guild_id, poll)
+
+    @Task.create(IntervalTrigger(seconds=POLL_FLUSH_INTERVAL))
+    async def flush_polls(self):
+        self.queue_snapshots()
+        await self.flush_dirty_polls()
+        self.unload_idle_voters()
+        if self.poll_messages.pin:
+            self.poll_messages.restore()
+        if evicted := self.polls.evict_idle():
+            log.debug(f"Evicted {evicted} idle polls from the cache")
+
+    @dis_snek.message_command()
+    async def migrate_polls(self, ctx: MessageContext):
+        if ctx.author.id != self.owner.id:
+            return await ctx.send(
+                f"Only {self.owner.mention} can migrate the poll database"
+            )
+
+        msg = await ctx.send(
+            "<a:loadinghmmm:957250458739675156> Migrating polls to the new layout..."
+        )
+        s = time.perf_counter()
+        migrated = 0
+        async for migrated in self.store.migrate_legacy():
+            await msg.edit(
+                f"<a:loadinghmmm:957250458739675156> Migrating polls to the new layout... {migrated} done"
+            )
+        dur = time.perf_counter() - s
+
+        await msg.edit(f"✅ Migrated {migrated} polls in {round(dur, 2)} seconds")
 
     @dis_snek.message_command()
     async def begin(self, ctx: MessageContext, arg: CMD_BODY):
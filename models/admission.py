@@ -0,0 +1,163 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import attr
+from dis_snek.models import Snowflake_Type
+
+
+@attr.s(auto_attribs=True, slots=True)
+class GuildQueue:
+    waiting: deque = attr.ib(factory=deque)
+    running: int = 0
+    admitted: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+    # slots handed out on the guild's current turn
+    turn: int = 0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.admitted if self.admitted else 0
+
+
+class FairAdmission:
+    """
+    Admits interaction work guild by guild, so one guild's vote storm can't take the whole bot.
+
+    At most `max_running` jobs run at once, and at most `per_guild` of those from one guild.
+    The rest wait in a queue per guild, and free slots are handed to the guilds with work waiting in turn,
+    each guild getting its weight's worth of slots per turn (1 unless `weights` says otherwise).
+    """
+
+    def __init__(
+        self,
+        max_running: int = 64,
+        per_guild: int = 8,
+        weights: Optional[dict[Snowflake_Type, int]] = None,
+    ):
+        self.max_running = max_running
+        self.per_guild = per_guild
+        self.weights = weights or {}
+
+        self._guilds: dict[Snowflake_Type, GuildQueue] = {}
+        # guilds with work waiting, in the order their turns come up
+        self._turns: deque[Snowflake_Type] = deque()
+        self.running = 0
+
+        self.admitted = 0
+        self.queued = 0
+        self.timeouts = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q.waiting) for q in self._guilds.values())
+
+    def guild_stats(self) -> list[tuple[Snowflake_Type, GuildQueue]]:
+        """Guilds with work running or waiting, busiest first"""
+        return sorted(
+            ((g, q) for g, q in self._guilds.items() if q.running or q.waiting),
+            key=lambda item: (len(item[1].waiting), item[1].running),
+            reverse=True,
+        )
+
+    @asynccontextmanager
+    async def slot(self, guild_id: Snowflake_Type, timeout: Optional[float] = None):
+        """Run the block once the guild is admitted, raises `asyncio.TimeoutError` if that takes over `timeout`"""
+        if timeout is None:
+            await self.acquire(guild_id)
+        else:
+            try:
+                await asyncio.wait_for(self.acquire(guild_id), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+        try:
+            yield
+        finally:
+            self.release(guild_id)
+
+    async def acquire(self, guild_id: Snowflake_Type):
+        queue = self._guilds.get(guild_id)
+        if queue is None:
+            queue = self._guilds[guild_id] = GuildQueue()
+
+        if not queue.waiting and self._has_room(queue):
+            self._admit(queue, 0)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.waiting.append((waiter, time.monotonic()))
+        if len(queue.waiting) == 1:
+            self._turns.append(guild_id)
+        self.queued += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # admitted just as it was cancelled, hand the slot back
+                self.release(guild_id)
+                raise
+            for i, (queued, _) in enumerate(queue.waiting):
+                if queued is waiter:
+                    del queue.waiting[i]
+                    if not queue.waiting:
+                        self._turns.remove(guild_id)
+                        queue.turn = 0
+                    break
+            self._forget_idle(guild_id, queue)
+            raise
+
+    def release(self, guild_id: Snowflake_Type):
+        queue = self._guilds[guild_id]
+        queue.running -= 1
+        self.running -= 1
+        self._forget_idle(guild_id, queue)
+        self._dispatch()
+
+    def _forget_idle(self, guild_id: Snowflake_Type, queue: GuildQueue):
+        if not queue.running and not queue.waiting and self._guilds.get(guild_id) is queue:
+            del self._guilds[guild_id]
+
+    def _has_room(self, queue: GuildQueue) -> bool:
+        return self.running < self.max_running and queue.running < self.per_guild
+
+    def _admit(self, queue: GuildQueue, waited: float):
+        queue.running += 1
+        queue.admitted += 1
+        queue.total_wait += waited
+        queue.max_wait = max(queue.max_wait, waited)
+        self.running += 1
+        self.admitted += 1
+
+    def _dispatch(self):
+        # a full lap of guilds that are all at their own limit means nothing more can go
+        blocked = 0
+        while self._turns and self.running < self.max_running and blocked < len(self._turns):
+            guild_id = self._turns[0]
+            queue = self._guilds[guild_id]
+            if not self._has_room(queue):
+                self._next_turn(queue)
+                blocked += 1
+                continue
+
+            waiter, queued_at = queue.waiting.popleft()
+            # cancelled waiters are removed when their task next runs, which may not have happened yet
+            if not waiter.done():
+                self._admit(queue, time.monotonic() - queued_at)
+                waiter.set_result(None)
+                blocked = 0
+                queue.turn += 1
+
+            if not queue.waiting:
+                # a guild only has a turn while it has work waiting
+                self._turns.popleft()
+                queue.turn = 0
+            elif queue.turn >= self.weights.get(guild_id, 1):
+                self._next_turn(queue)
+
+    def _next_turn(self, queue: GuildQueue):
+        queue.turn = 0
+        self._turns.rotate(-1)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dis_snek.models import Snowflake_Type, to_snowflake
+
+log = logging.getLogger("Janet")
+
+AuthorKey = tuple[Snowflake_Type, Snowflake_Type]
+
+
+def author_data(member) -> dict:
+    return {"name": member.display_name, "avatar_url": member.avatar.url}
+
+
+class AuthorCache:
+    """
+    Poll authors' names and avatars, looked up when a poll is rendered rather than when it's loaded.
+
+    Entries live in a bounded LRU keyed by (guild, user). Misses for the same guild are collected for
+    `batch_delay` and requested together as one gateway member chunk, instead of a REST call per poll.
+    Users that can't be found are remembered for `miss_ttl` so they aren't requested on every edit.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_size: int = 10_000,
+        batch_delay: float = 0.25,
+        chunk_timeout: float = 5,
+        miss_ttl: float = 600,
+    ):
+        self.client = client
+        self.max_size = max_size
+        self.batch_delay = batch_delay
+        self.chunk_timeout = chunk_timeout
+        self.miss_ttl = miss_ttl
+
+        self._data: OrderedDict[AuthorKey, dict] = OrderedDict()
+        self._missing: dict[AuthorKey, float] = {}
+        self._pending: dict[Snowflake_Type, set[Snowflake_Type]] = {}
+        self._batches: dict[Snowflake_Type, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.chunk_requests = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, guild_id: Snowflake_Type, user_id: Snowflake_Type) -> Optional[dict]:
+        """An author's data if it's already known, checking the member cache before giving up"""
+        key = (to_snowflake(guild_id), to_snowflake(user_id))
+        if data := self._data.get(key):
+            self._data.move_to_end(key)
+            self.hits += 1
+            return data
+        if member := self.client.cache.get_member(*key):
+            self.hits += 1
+            return self.put(*key, author_data(member))
+        return None
+
+    def put(self, guild_id: Snowflake_Type, user_id: Snowflake_Type, data: dict) -> dict:
+        key = (to_snowflake(guild_id), to_snowflake(user_id))
+        self._data[key] = data
+        self._data.move_to_end(key)
+        self._missing.pop(key, None)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+        return data
+
+    async def resolve(self, guild_id: Snowflake_Type, user_id: Snowflake_Type) -> Optional[dict]:
+        """Look an author up, joining this guild's next member chunk request if they aren't known"""
+        guild_id, user_id = to_snowflake(guild_id), to_snowflake(user_id)
+        if data := self.get(guild_id, user_id):
+            return data
+        if self._missing.get((guild_id, user_id), 0) > time.monotonic():
+            return None
+
+        self.misses += 1
+        self._pending.setdefault(guild_id, set()).add(user_id)
+        if guild_id not in self._batches:
+            self._batches[guild_id] = asyncio.ensure_future(self._request(guild_id))
+        await asyncio.shield(self._batches[guild_id])
+        return self.get(guild_id, user_id)
+
+    async def _request(self, guild_id: Snowflake_Type):
+        # let the rest of this burst join the request, anyone missing after this starts the next one
+        await asyncio.sleep(self.batch_delay)
+        user_ids = self._pending.pop(guild_id, set())
+        del self._batches[guild_id]
+        if not user_ids:
+            return
+
+        try:
+            self.chunk_requests += 1
+            # discord caps user_ids at 100 per request
+            ids = sorted(user_ids)
+            for i in range(0, len(ids), 100):
+                await self.client.ws.request_member_chunks(
+                    guild_id, limit=0, user_ids=ids[i : i + 100]
+                )
+
+            # chunks are cached by dis_snek as they arrive, wait for them to show up
+            deadline = time.monotonic() + self.chunk_timeout
+            while time.monotonic() < deadline:
+                if all(self.client.cache.get_member(guild_id, u) for u in user_ids):
+                    break
+                await asyncio.sleep(0.1)
+
+            for user_id in user_ids:
+                if not self.get(guild_id, user_id):
+                    # probably left the guild
+                    self._missing[(guild_id, user_id)] = time.monotonic() + self.miss_ttl
+            self._expire_missing()
+        except Exception as e:
+            log.error(f"Failed to request members for {guild_id}: {e}")
+
+    def _expire_missing(self):
+        if len(self._missing) > self.max_size:
+            now = time.monotonic()
+            self._missing = {k: v for k, v in self._missing.items() if v > now}
@@ -0,0 +1,64 @@
+import math
+from array import array
+
+from dis_snek.models import Snowflake_Type
+
+MASK64 = (1 << 64) - 1
+
+
+def mix64(x: int) -> int:
+    """splitmix64's finalizer, snowflakes share most of their bits so they need spreading out"""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class CountingBloomFilter:
+    """
+    A compact set of ids that supports removal, with no false negatives but some false positives.
+
+    Each slot is a byte counter rather than a bit, so removing an id only undoes that id.
+    A counter that reaches 255 sticks there, as it can no longer tell how many ids share it.
+    """
+
+    def __init__(self, capacity: int = 500_000, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._counters = array("B", bytes(self.size))
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _slots(self, item: Snowflake_Type) -> list[int]:
+        h = mix64(int(item))
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: Snowflake_Type) -> bool:
+        return all(self._counters[i] for i in self._slots(item))
+
+    def add(self, item: Snowflake_Type):
+        for i in self._slots(item):
+            if self._counters[i] < 255:
+                self._counters[i] += 1
+        self.count += 1
+
+    def remove(self, item: Snowflake_Type):
+        """Remove an id, this must have been added, removing anything else can hide other ids"""
+        slots = self._slots(item)
+        if not all(self._counters[i] for i in slots):
+            return
+        for i in slots:
+            if self._counters[i] < 255:
+                self._counters[i] -= 1
+        self.count -= 1
+
+    def clear(self):
+        self._counters = array("B", bytes(self.size))
+        self.count = 0
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self._counters.__sizeof__()
@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+
+from dis_snek.models import Snowflake_Type
+
+from models.poll import PollData
+
+PollKey = tuple[Snowflake_Type, Snowflake_Type]
+
+
+class PollCache:
+    """
+    A bounded LRU of loaded polls, redis holds the rest and `get_poll` loads them back on demand.
+
+    Once there are more than `max_size` polls, or a poll hasn't been used for `idle_ttl` seconds,
+    the least recently used ones are dropped. Polls that `is_pinned` says are still in use
+    (ie unsaved or locked) are skipped, dropping those would lose votes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        idle_ttl: float = 1800,
+        is_pinned: Callable[[PollKey, PollData], bool] = lambda key, poll: False,
+    ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.is_pinned = is_pinned
+
+        # (guild, message) -> (poll, last used)
+        self._polls: OrderedDict[PollKey, tuple[PollData, float]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._polls)
+
+    def __contains__(self, key: PollKey) -> bool:
+        return key in self._polls
+
+    def __iter__(self) -> Iterator[PollKey]:
+        return iter(list(self._polls))
+
+    def get(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> Optional[PollData]:
+        key = (guild_id, msg_id)
+        if entry := self._polls.get(key):
+            self._polls[key] = (entry[0], time.monotonic())
+            self._polls.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def peek(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> Optional[PollData]:
+        """Get a poll without counting it as a use"""
+        if entry := self._polls.get((guild_id, msg_id)):
+            return entry[0]
+        return None
+
+    def put(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type, poll: PollData):
+        key = (guild_id, msg_id)
+        self._polls[key] = (poll, time.monotonic())
+        self._polls.move_to_end(key)
+        if len(self._polls) > self.max_size:
+            self._evict(lambda: len(self._polls) > self.max_size)
+
+    def pop(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> Optional[PollData]:
+        if entry := self._polls.pop((guild_id, msg_id), None):
+            return entry[0]
+        return None
+
+    def idle(self, seconds: float) -> Iterator[tuple[PollKey, PollData]]:
+        """Polls that haven't been used in `seconds`, least recently used first"""
+        cutoff = time.monotonic() - seconds
+        for key, (poll, last_used) in self._polls.items():
+            if last_used >= cutoff:
+                break
+            yield key, poll
+
+    def evict_idle(self) -> int:
+        """Drop polls that haven't been used in `idle_ttl` seconds, returns how many were dropped"""
+        cutoff = time.monotonic() - self.idle_ttl
+        return self._evict(
+            lambda: self._polls and next(iter(self._polls.values()))[1] < cutoff
+        )
+
+    def _evict(self, should_evict: Callable[[], bool]) -> int:
+        evicted = 0
+        # pinned polls are moved to the back, so give up once every poll has been looked at
+        for _ in range(len(self._polls)):
+            if not should_evict():
+                break
+            key, (poll, last_used) = self._polls.popitem(last=False)
+            if self.is_pinned(key, poll):
+                self._polls[key] = (poll, last_used)
+                continue
+            evicted += 1
+        self.evictions += evicted
+        return evicted
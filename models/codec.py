@@ -0,0 +1,182 @@
+"""
+Binary encoding for poll records.
+
+    header      version, flags, option count, author id, channel id, message id, expiry (µs since epoch)
+    strings     title, colour, then the author's name and avatar url if the author flag is set,
+                and the last vote stream id if the stream flag is set (version 2+)
+    options     text, emoji, style, voter count, then that many packed uint64 voter ids if the voters flag is set
+
+Strings are a uint32 length followed by utf-8. Everything is little endian, so voter arrays are copied
+straight in and out of `VoterSet` without touching each id.
+
+Voter counts are written either way, so a poll can be rendered from `decode(data, voters=False)`
+without unpacking its voters. Version 2 records without voters have counts of 0.
+
+Records written before this start with `{`, `decode` still reads those as JSON.
+"""
+import datetime
+import struct
+import sys
+from typing import Union
+
+import orjson
+from dis_snek import MISSING
+
+from models.poll import PollData, PollOption
+from models.voters import VoterSet
+
+CODEC_VERSION = 2
+
+HEADER = struct.Struct("<BBBQQQq")
+OPTION = struct.Struct("<BI")
+LENGTH = struct.Struct("<I")
+
+SINGLE_VOTE = 1
+INLINE = 2
+EXPIRED = 4
+VOTERS = 8
+EXPIRES = 16
+AUTHOR = 32
+STREAM = 64
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+SWAP_BYTES = sys.byteorder != "little"
+
+
+def has_voters(data: dict) -> bool:
+    """Whether a JSON record carries its own voters, rather than keeping them in option sets"""
+    return all("voters" in o for o in data.get("poll_options", []))
+
+
+def _pack_str(parts: list, value: str):
+    raw = (value or "").encode()
+    parts.append(LENGTH.pack(len(raw)))
+    parts.append(raw)
+
+
+def _unpack_str(data: memoryview, offset: int) -> tuple[str, int]:
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    return str(data[offset : offset + length], "utf-8"), offset + length
+
+
+def _voter_bytes(voters: VoterSet) -> bytes:
+    if not SWAP_BYTES:
+        return bytes(voters)
+    ids = VoterSet.copy(voters)._ids
+    ids.byteswap()
+    return ids.tobytes()
+
+
+def _load_voters(data: memoryview) -> VoterSet:
+    voters = VoterSet.from_bytes(data)
+    if SWAP_BYTES:
+        voters._ids.byteswap()
+    return voters
+
+
+def encode(poll: PollData, voters: bool = True) -> bytes:
+    if voters and not poll.voters_loaded:
+        raise ValueError("Can't encode a poll's voters without loading them")
+    flags = (
+        (SINGLE_VOTE if poll.single_vote else 0)
+        | (INLINE if poll.inline else 0)
+        | (EXPIRED if poll._expired else 0)
+        | (VOTERS if voters else 0)
+        | (EXPIRES if poll.expire_time else 0)
+        | (AUTHOR if poll.author_data else 0)
+        | (STREAM if poll.stream_id else 0)
+    )
+    expires = (poll.expire_time - EPOCH) // MICROSECOND if poll.expire_time else 0
+
+    parts = [
+        HEADER.pack(
+            CODEC_VERSION,
+            flags,
+            len(poll.poll_options),
+            int(poll.author_id),
+            int(poll.channel_id or 0),
+            int(poll.message_id or 0),
+            expires,
+        )
+    ]
+    _pack_str(parts, poll.title)
+    _pack_str(parts, poll.colour)
+    if poll.author_data:
+        _pack_str(parts, poll.author_data["name"])
+        _pack_str(parts, poll.author_data["avatar_url"])
+    if poll.stream_id:
+        _pack_str(parts, poll.stream_id)
+
+    for option in poll.poll_options:
+        _pack_str(parts, option.text)
+        _pack_str(parts, option.emoji)
+        parts.append(OPTION.pack(option.style, option.vote_count))
+        if voters:
+            parts.append(_voter_bytes(option.voters))
+    return b"".join(parts)
+
+
+def decode(data: Union[bytes, str], voters: bool = True) -> tuple[PollData, bool]:
+    """
+    Load a record, returns the poll and whether the record had its voters in it.
+
+    With `voters` False the options only get their counts, see `PollData.unload_voters`.
+    """
+    if isinstance(data, str) or data[:1] == b"{":
+        loaded = orjson.loads(data)
+        poll = PollData(**loaded)
+        if not voters:
+            poll.unload_voters()
+        return poll, has_voters(loaded)
+
+    data = memoryview(data)
+    version, flags, option_count, author_id, channel_id, message_id, expires = (
+        HEADER.unpack_from(data)
+    )
+    if not 1 <= version <= CODEC_VERSION:
+        raise ValueError(f"Unknown poll record version: {version}")
+    offset = HEADER.size
+
+    title, offset = _unpack_str(data, offset)
+    colour, offset = _unpack_str(data, offset)
+    author_data = MISSING
+    if flags & AUTHOR:
+        name, offset = _unpack_str(data, offset)
+        avatar_url, offset = _unpack_str(data, offset)
+        author_data = {"name": name, "avatar_url": avatar_url}
+    stream_id = None
+    if flags & STREAM:
+        stream_id, offset = _unpack_str(data, offset)
+
+    options = []
+    for _ in range(option_count):
+        text, offset = _unpack_str(data, offset)
+        emoji, offset = _unpack_str(data, offset)
+        style, voter_count = OPTION.unpack_from(data, offset)
+        offset += OPTION.size
+        if not flags & VOTERS:
+            option = PollOption(text, emoji, None, style)
+        else:
+            end = offset + voter_count * 8
+            option = PollOption(text, emoji, _load_voters(data[offset:end]) if voters else None, style)
+            offset = end
+        option.count = voter_count
+        options.append(option)
+
+    poll = PollData(
+        title=title,
+        author_id=author_id,
+        channel_id=channel_id or MISSING,
+        message_id=message_id or MISSING,
+        author_data=author_data,
+        poll_options=options,
+        single_vote=bool(flags & SINGLE_VOTE),
+        inline=bool(flags & INLINE),
+        colour=colour,
+        expire_time=EPOCH + expires * MICROSECOND if flags & EXPIRES else MISSING,
+        expired=bool(flags & EXPIRED),
+    )
+    poll.stream_id = stream_id
+    return poll, bool(flags & VOTERS)
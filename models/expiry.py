@@ -0,0 +1,89 @@
+import asyncio
+import datetime
+import heapq
+import time
+from typing import Optional
+
+from dis_snek.models import Snowflake_Type
+
+PollKey = tuple[Snowflake_Type, Snowflake_Type]
+
+
+class ExpiryQueue:
+    """
+    Min-heap of poll expiry times.
+
+    Cancelled or rescheduled polls are left in the heap and skipped when they reach the top,
+    `_entries` holds the live expiry time for each poll.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, PollKey]] = []
+        self._entries: dict[PollKey, float] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: PollKey) -> bool:
+        return key in self._entries
+
+    def schedule(
+        self,
+        guild_id: Snowflake_Type,
+        msg_id: Snowflake_Type,
+        expire_time: datetime.datetime,
+    ):
+        key = (guild_id, msg_id)
+        when = expire_time.timestamp()
+        if self._entries.get(key) == when:
+            return
+        self._entries[key] = when
+        heapq.heappush(self._heap, (when, key))
+        if self._heap[0][1] == key:
+            # new earliest poll, whoever is waiting needs to wake sooner
+            self._changed.set()
+        self._compact()
+
+    def cancel(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        self._entries.pop((guild_id, msg_id), None)
+
+    @property
+    def next_due(self) -> Optional[float]:
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> list[PollKey]:
+        """Remove and return every poll whose expiry time has passed"""
+        now = time.time() if now is None else now
+        due = []
+        while (when := self.next_due) is not None and when <= now:
+            _, key = heapq.heappop(self._heap)
+            del self._entries[key]
+            due.append(key)
+        return due
+
+    async def wait(self, timeout: Optional[float] = None):
+        """Sleep until the next poll is due or `timeout` passes, waking early if an earlier one is scheduled"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            self._changed.clear()
+            when = self.next_due
+            if deadline is not None and (when is None or deadline < when):
+                when = deadline
+            delay = None if when is None else when - time.time()
+            if delay is not None and delay <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                return
+
+    def _prune(self):
+        while self._heap and self._entries.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(when, key) for key, when in self._entries.items()]
+            heapq.heapify(self._heap)
@@ -0,0 +1,99 @@
+"""
+Picks one bot process to run the periodic jobs that mustn't run in every process, like delivering reminders.
+
+    leader:<name>   the leader's process id, set with a ttl that the leader keeps renewing
+
+Every process tries to take the lease with `SET NX PX`, and the leader renews it, checking it still holds it
+in a script so a lease that's already passed to another process isn't extended. If the leader dies the lease
+runs out and another process takes it within a renewal interval after that, a process that stops cleanly
+hands it over straight away.
+
+A process only counts itself the leader until the ttl would have run out from when it last renewed,
+so it stops before anyone else can start, even if redis can't be reached to say it's lost the lease.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+import aioredis
+
+log = logging.getLogger("Janet")
+
+RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    def __init__(self, redis: aioredis.Redis, name: str, ttl: float = 10):
+        self.redis = redis
+        self.key = f"leader:{name}"
+        self.ttl = ttl
+        self.instance_id = uuid.uuid4().hex
+
+        self._renew = redis.register_script(RENEW_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+        # when our lease runs out if it isn't renewed, by the monotonic clock
+        self._expires = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.elections = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._expires
+
+    def start(self):
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._expires:
+            self._expires = 0.0
+            try:
+                await self._release(keys=[self.key], args=[self.instance_id])
+            except Exception as e:
+                log.error(f"Failed to release the {self.key} lease: {e}")
+
+    async def renew(self) -> bool:
+        """Take the lease if it's free or renew it if it's ours, returns whether we're the leader"""
+        was_leader = self.is_leader
+        # counted from before the request, redis starts the ttl later than that
+        sent = time.monotonic()
+        ttl = int(self.ttl * 1000)
+        if self._expires:
+            held = await self._renew(keys=[self.key], args=[self.instance_id, ttl])
+        else:
+            held = await self.redis.set(self.key, self.instance_id, nx=True, px=ttl)
+        self._expires = sent + self.ttl if held else 0.0
+
+        if held and not was_leader:
+            self.elections += 1
+            log.info(f"This process is now the leader for {self.key}")
+        elif was_leader and not held:
+            log.warning(f"This process lost the {self.key} lease")
+        return bool(held)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.renew()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Failed to renew the {self.key} lease: {e}")
+            await asyncio.sleep(self.ttl / 3)
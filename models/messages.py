@@ -0,0 +1,64 @@
+from dis_snek.models import Embed, Message, Snowflake_Type, to_snowflake
+from dis_snek.models.discord.message import process_message_payload
+
+
+class PollMessages:
+    """
+    Edits poll messages by (channel, message) id through the http api, so a poll whose message has fallen out of
+    (or never made it into) dis_snek's message cache still gets edited, without fetching the message first.
+
+    With `pin` on, open polls' `Message` objects are held here too, from when they're sent or first edited,
+    and `restore` puts them back in the message cache when it expires them.
+    That's a message object per open poll, so it's off by default.
+    """
+
+    def __init__(self, client, pin: bool = False):
+        self.client = client
+        self.pin = pin
+        self._pinned: dict[Snowflake_Type, Message] = {}
+
+        self.edits = 0
+
+    def __len__(self) -> int:
+        return len(self._pinned)
+
+    def keep(self, message: Message):
+        """Pin a poll's message, if pinning is on"""
+        if self.pin and message:
+            self._pinned[to_snowflake(message.id)] = message
+
+    def release(self, message_id: Snowflake_Type):
+        self._pinned.pop(to_snowflake(message_id), None)
+
+    def restore(self) -> int:
+        """Put pinned messages the message cache has expired back into it, returns how many there were"""
+        cache = self.client.cache.message_cache
+        restored = 0
+        for message in self._pinned.values():
+            key = (to_snowflake(message._channel_id), message.id)
+            if key not in cache:
+                cache[key] = message
+                restored += 1
+        return restored
+
+    async def edit(
+        self,
+        channel_id: Snowflake_Type,
+        message_id: Snowflake_Type,
+        embed: Embed,
+        components: list,
+    ):
+        """Replace a poll message's embed and components, raises `NotFound` if the message is gone"""
+        payload = process_message_payload(embeds=embed, components=components)
+        data = await self.client.http.edit_message(payload, channel_id, message_id)
+        self.edits += 1
+
+        if not data:
+            return
+        key = (to_snowflake(channel_id), to_snowflake(message_id))
+        if self.pin:
+            # pinned from its first edit, polls loaded from redis were never created here to be kept
+            self._pinned[key[1]] = self.client.cache.place_message_data(data)
+        elif key in self.client.cache.message_cache:
+            # only refresh messages something's holding on to, building one for every edit isn't worth it
+            self.client.cache.place_message_data(data)
@@ -1,8 +1,9 @@
 import asyncio
 import datetime
-from typing import Union
+from typing import Optional, Union
 
 import attr
+import orjson
 from dis_snek import MISSING
 from dis_snek.models import (
     Snowflake_Type,
@@ -20,6 +21,7 @@ from dis_snek.models import (
 )
 
 from models.emoji import emoji
+from models.voters import VoteIndex, VoterSet
 
 
 def deserialize_datetime(date):
@@ -28,12 +30,34 @@ def deserialize_datetime(date):
     return date
 
 
+def serialize_value(inst, field, value):
+    if isinstance(value, VoterSet):
+        return value.to_list()
+    return value
+
+
+def convert_voters(value) -> Optional[VoterSet]:
+    return None if value is None else VoterSet.convert(value)
+
+
+def transient(**kwargs):
+    """An attribute that only lives in memory, it isn't persisted and doesn't bump the render version"""
+    return attr.ib(init=False, eq=False, repr=False, metadata={"transient": True}, **kwargs)
+
+
 @attr.s(auto_attribs=True, on_setattr=[attr.setters.convert, attr.setters.validate])
 class PollOption:
     text: str
     emoji: str
-    voters: set[Snowflake_Type] = attr.ib(factory=set, converter=set)
+    # None while only the vote count is loaded, see `PollData.unload_voters`
+    voters: Optional[VoterSet] = attr.ib(factory=VoterSet, converter=convert_voters)
     style: int = attr.ib(default=1)
+    # the number of voters, kept for when `voters` isn't loaded
+    count: int = transient(default=0)
+
+    @property
+    def vote_count(self) -> int:
+        return self.count if self.voters is None else len(self.voters)
 
     @property
     def inline_text(self):
@@ -44,7 +68,7 @@ class PollOption:
         progBarLength = 10
         percentage = 0
         if total_votes != 0:
-            percentage = len(self.voters) / total_votes
+            percentage = self.vote_count / total_votes
             for i in range(progBarLength):
                 if round(percentage, 1) <= 1 / progBarLength * i:
                     progBarStr += "□"
@@ -55,16 +79,22 @@ class PollOption:
         progBarStr = progBarStr + f" {round(percentage * 100)}%"
         return progBarStr
 
-    def vote(self, author_id: Snowflake_Type):
-        if author_id not in self.voters:
-            self.voters.add(author_id)
-            return True
-        else:
-            self.voters.remove(author_id)
-            return False
+    def unload(self):
+        if self.voters is not None:
+            self.count = len(self.voters)
+            self.voters = None
 
 
-@attr.s(auto_attribs=True, on_setattr=[attr.setters.convert, attr.setters.validate])
+def bump_version(instance: "PollData", attribute: attr.Attribute, value):
+    if not attribute.metadata.get("transient"):
+        instance.touch()
+    return value
+
+
+@attr.s(
+    auto_attribs=True,
+    on_setattr=[attr.setters.convert, attr.setters.validate, bump_version],
+)
 class PollData:
     title: str
     author_id: Snowflake_Type
@@ -87,13 +117,32 @@ class PollData:
     _expired: bool = attr.ib(default=False)
     lock: asyncio.Lock = attr.ib(factory=asyncio.Lock)
 
+    # bumped on every change that can alter the rendered message
+    version: int = transient(default=0)
+    # (version, embed, components, payload hash) of the last render
+    _rendered: Optional[tuple] = transient(default=None)
+    # payload hash of the last version sent to discord
+    sent_hash: Optional[int] = transient(default=None)
+    # in `stream` storage, the last vote event this poll includes
+    stream_id: Optional[str] = transient(default=None)
+    # user -> options they voted for, built from the voter sets the first time it's needed
+    _vote_index: Optional[VoteIndex] = transient(default=None)
+
     def __dict__(self):
         return {
             k.removeprefix("_"): v
-            for k, v in attr.asdict(self).items()
+            for k, v in attr.asdict(
+                self,
+                filter=lambda a, _: not a.metadata.get("transient"),
+                value_serializer=serialize_value,
+            ).items()
             if v != MISSING and not isinstance(v, asyncio.Lock)
         }
 
+    def touch(self):
+        """Mark the poll as changed, anything mutating options in place needs to call this"""
+        self.version += 1
+
     @property
     def expired(self):
         if self._expired:
@@ -108,9 +157,40 @@ class PollData:
     def total_votes(self):
         votes = 0
         for o in self.poll_options:
-            votes += len(o.voters)
+            votes += o.vote_count
         return votes
 
+    @property
+    def voters_loaded(self) -> bool:
+        return all(o.voters is not None for o in self.poll_options)
+
+    def unload_voters(self):
+        """Drop the voter sets, keeping only each option's count, enough to render the poll"""
+        for o in self.poll_options:
+            o.unload()
+        self._vote_index = None
+
+    @property
+    def vote_index(self) -> VoteIndex:
+        if self._vote_index is None:
+            if not self.voters_loaded:
+                raise ValueError("This poll's voters aren't loaded")
+            self._vote_index = VoteIndex.from_options(o.voters for o in self.poll_options)
+        return self._vote_index
+
+    def votes_of(self, author_id: Snowflake_Type) -> list[int]:
+        """The indexes of the options a user has voted for"""
+        if self._vote_index is not None:
+            return self._vote_index.options(author_id)
+        author_id = int(author_id)
+        return [i for i, o in enumerate(self.poll_options) if author_id in o.voters]
+
+    def has_voted(self, author_id: Snowflake_Type) -> bool:
+        if self._vote_index is not None:
+            return bool(self._vote_index.get(author_id))
+        author_id = int(author_id)
+        return any(author_id in o.voters for o in self.poll_options)
+
     def get_colour(self):
         if self.expired:
             return MaterialColors.GREY
@@ -121,8 +201,31 @@ class PollData:
         else:
             return BrandColors.BLURPLE
 
+    def _render(self) -> tuple:
+        expired = self.expired  # may flip _expired, so check it before reading the version
+        if self._rendered is None or self._rendered[0] != self.version:
+            embed = self._build_embed()
+            components = [] if expired else self._build_components()
+            payload = orjson.dumps(
+                [embed.to_dict(), [c.to_dict() for c in components]], default=str
+            )
+            self._rendered = (self.version, embed, components, hash(payload))
+        return self._rendered
+
     @property
     def embed(self) -> Embed:
+        return self._render()[1]
+
+    @property
+    def components(self):
+        return self._render()[2]
+
+    @property
+    def payload_hash(self) -> int:
+        """Hash of the rendered message, if it matches `sent_hash` discord already shows this version"""
+        return self._render()[3]
+
+    def _build_embed(self) -> Embed:
         e = Embed(
             f"Poll: {self.title}" if self.title else None,
             "",
@@ -164,8 +267,7 @@ class PollData:
 
         return e
 
-    @property
-    def components(self):
+    def _build_components(self):
         buttons = []
         for i in range(len(self.poll_options)):
             buttons.append(
@@ -175,10 +277,52 @@ class PollData:
             )
         return spread_to_rows(*buttons)
 
+    def vote(self, opt_index: int, author_id: Snowflake_Type) -> bool:
+        """Toggle a vote, on single vote polls this also clears the user's other votes"""
+        if self.single_vote:
+            voted = not self.vote_index.get(author_id) >> opt_index & 1
+        else:
+            voted = int(author_id) not in self.poll_options[opt_index].voters
+        self.apply_vote(opt_index, author_id, voted)
+        return voted
+
+    def apply_vote(self, opt_index: int, author_id: Snowflake_Type, added: bool):
+        """Set a vote to the outcome of a vote made elsewhere, ie by another process"""
+        if opt_index >= len(self.poll_options):
+            return
+        author_id = int(author_id)
+        # multiple vote polls only need the option's own voters, their index is kept up to date if it's been built
+        index = self.vote_index if self.single_vote else self._vote_index
+        mask = index.get(author_id) if index is not None else 0
+        bit = 1 << opt_index
+        if added:
+            if self.single_vote:
+                # the index says which options to clear, rather than checking every option's voters
+                for i in index.options(author_id):
+                    self.poll_options[i].voters.discard(author_id)
+                mask = 0
+            self.poll_options[opt_index].voters.add(author_id)
+            mask |= bit
+        else:
+            self.poll_options[opt_index].voters.discard(author_id)
+            mask &= ~bit
+        if index is not None:
+            index.set(author_id, mask)
+        self.touch()
+
     def add_option(self, opt_name: str):
-        self.poll_options.append(
-            PollOption(opt_name.strip(), emoji[len(self.poll_options)])
-        )
+        option = PollOption(opt_name.strip(), emoji[len(self.poll_options)])
+        if not self.voters_loaded:
+            # the other options only have counts, so this one does too
+            option.unload()
+        self.poll_options.append(option)
+        self.touch()
+
+    def remove_option(self, index: int):
+        del self.poll_options[index]
+        # option indexes have shifted
+        self._vote_index = None
+        self.touch()
 
     def parse_message(self, msg: Message):
         self.channel_id = msg.channel.id
@@ -220,9 +364,8 @@ class PollData:
 
     async def send(self, target: Union[GuildText, InteractionContext]) -> Message:
         try:
-            msg = await target.send(
-                embeds=self.embed, components=[] if self.expired else self.components
-            )
+            msg = await target.send(embeds=self.embed, components=self.components)
+            self.sent_hash = self.payload_hash
             self.parse_message(msg)
             return msg
         except Exception as e:
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+import attr
+from dis_snek.models import Snowflake_Type
+
+log = logging.getLogger("Janet")
+
+
+@attr.s(auto_attribs=True, slots=True)
+class PendingEdit:
+    guild_id: Snowflake_Type
+    channel_id: Snowflake_Type
+    first_marked: float
+    due: float
+
+
+class EditScheduler:
+    """
+    Debounced, rate-limit aware poll message edits.
+
+    Marking a poll queues one edit for its message, marks that arrive before it runs are merged into it.
+    The debounce grows with the channel's vote rate, so busy polls are edited less often rather than constantly.
+    Each channel has at most one edit in flight and is kept within discord's edit bucket,
+    different channels are edited concurrently by up to `workers` edits at once.
+    """
+
+    def __init__(
+        self,
+        edit: Callable[[Snowflake_Type, Snowflake_Type], Awaitable],
+        workers: int = 8,
+        min_delay: float = 0.5,
+        max_delay: float = 5.0,
+        bucket_size: int = 5,
+        bucket_window: float = 5.0,
+    ):
+        self.edit = edit
+        self.workers = workers
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.bucket_size = bucket_size
+        self.bucket_window = bucket_window
+
+        self._pending: dict[Snowflake_Type, PendingEdit] = {}
+        self._busy: set[Snowflake_Type] = set()
+        self._sent: dict[Snowflake_Type, deque[float]] = {}
+        self._marks: dict[Snowflake_Type, deque[float]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task = None
+
+        self.edits = 0
+        self.failures = 0
+        self.lag: deque[float] = deque(maxlen=100)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._busy)
+
+    @property
+    def average_lag(self) -> float:
+        return sum(self.lag) / len(self.lag) if self.lag else 0
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.lag, default=0)
+
+    def start(self):
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def mark(
+        self,
+        guild_id: Snowflake_Type,
+        channel_id: Snowflake_Type,
+        msg_id: Snowflake_Type,
+    ):
+        """Queue an edit for a poll message"""
+        now = time.monotonic()
+        marks = self._marks.setdefault(channel_id, deque(maxlen=500))
+        marks.append(now)
+
+        if msg_id not in self._pending:
+            self._pending[msg_id] = PendingEdit(
+                guild_id, channel_id, now, now + self._delay(marks, now)
+            )
+            self._wakeup.set()
+
+    def discard(self, msg_id: Snowflake_Type):
+        """Drop a queued edit, ie when the poll has been closed"""
+        self._pending.pop(msg_id, None)
+
+    def _delay(self, marks: deque[float], now: float) -> float:
+        while marks and marks[0] < now - self.bucket_window:
+            marks.popleft()
+        votes_per_second = len(marks) / self.bucket_window
+        return min(self.max_delay, self.min_delay * (1 + votes_per_second / 5))
+
+    def _bucket_free_at(self, channel_id: Snowflake_Type, now: float) -> float:
+        sent = self._sent.get(channel_id)
+        if not sent:
+            return now
+        while sent and sent[0] < now - self.bucket_window:
+            sent.popleft()
+        if len(sent) < self.bucket_size:
+            return now
+        return sent[0] + self.bucket_window
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_due = None
+
+            for msg_id, pending in list(self._pending.items()):
+                if len(self._busy) >= self.workers:
+                    break
+                if pending.channel_id in self._busy:
+                    continue
+                ready_at = max(pending.due, self._bucket_free_at(pending.channel_id, now))
+                if ready_at <= now:
+                    self._busy.add(pending.channel_id)
+                    del self._pending[msg_id]
+                    asyncio.create_task(self._edit(msg_id, pending))
+                elif next_due is None or ready_at < next_due:
+                    next_due = ready_at
+
+            try:
+                timeout = None if next_due is None else next_due - now
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _edit(self, msg_id: Snowflake_Type, pending: PendingEdit):
+        try:
+            self._sent.setdefault(pending.channel_id, deque()).append(time.monotonic())
+            await self.edit(pending.guild_id, msg_id)
+            self.edits += 1
+            self.lag.append(time.monotonic() - pending.first_marked)
+        except Exception as e:
+            self.failures += 1
+            log.error(f"Failed to update poll {msg_id}: {e}")
+        finally:
+            self._busy.discard(pending.channel_id)
+            self._wakeup.set()
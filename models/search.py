@@ -0,0 +1,182 @@
+import heapq
+import time
+from typing import Callable, Optional, Sequence
+
+import attr
+from dis_snek.models import Snowflake_Type
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import JaroWinkler
+
+IndexKey = tuple[Snowflake_Type, Snowflake_Type]
+
+SCORERS = {
+    "partial_ratio": fuzz.partial_ratio,
+    "ratio": fuzz.ratio,
+    "jaro_winkler": JaroWinkler.normalized_similarity,
+}
+
+
+def top_matches(
+    query: str,
+    choices: Sequence[str],
+    limit: Optional[int] = 25,
+    scorer: str = "partial_ratio",
+    processor: Optional[Callable[[str], str]] = None,
+) -> list[tuple[int, float]]:
+    """
+    Score every choice against the query in one batched call, and return the (index, score) of the best matches.
+
+    Choices are compared as given, pass `processor` (ie `normalize`) if they haven't been cleaned up already.
+    """
+    if not choices:
+        return []
+    return [
+        (index, score)
+        for _, score, index in process.extract(
+            query, choices, scorer=SCORERS[scorer], processor=processor, limit=limit
+        )
+    ]
+
+
+def scores(
+    query: str,
+    choices: Sequence[str],
+    scorer: str = "partial_ratio",
+    processor: Optional[Callable[[str], str]] = None,
+) -> list[float]:
+    """Every choice's score against the query, in the order given"""
+    if not choices:
+        return []
+    return process.cdist(
+        [query], choices, scorer=SCORERS[scorer], processor=processor
+    )[0].tolist()
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@attr.s(auto_attribs=True, slots=True)
+class CachedSearch:
+    query: str
+    candidates: list[Snowflake_Type]
+    expires: float
+
+
+class PollSearchIndex:
+    """
+    Open poll titles indexed per (guild, author) for autocomplete.
+
+    Titles are prefiltered by shared trigrams before being fuzzy scored, and the candidates for each
+    user's last query are kept for a few seconds so typing another character only rescores those.
+    """
+
+    def __init__(self, max_candidates: int = 200, cache_ttl: float = 10):
+        self.max_candidates = max_candidates
+        self.cache_ttl = cache_ttl
+
+        self._titles: dict[IndexKey, dict[Snowflake_Type, tuple[str, str]]] = {}
+        self._grams: dict[IndexKey, dict[str, set[Snowflake_Type]]] = {}
+        self._owners: dict[Snowflake_Type, IndexKey] = {}
+        self._cache: dict[IndexKey, CachedSearch] = {}
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def add(
+        self,
+        guild_id: Snowflake_Type,
+        author_id: Snowflake_Type,
+        msg_id: Snowflake_Type,
+        title: Optional[str],
+    ):
+        key = (guild_id, author_id)
+        if msg_id in self._owners:
+            self.remove(msg_id)
+        title = title or ""
+        normalized = normalize(title)
+
+        self._owners[msg_id] = key
+        self._titles.setdefault(key, {})[msg_id] = (title, normalized)
+        grams = self._grams.setdefault(key, {})
+        for gram in trigrams(normalized):
+            grams.setdefault(gram, set()).add(msg_id)
+        self._cache.pop(key, None)
+
+    def remove(self, msg_id: Snowflake_Type):
+        if (key := self._owners.pop(msg_id, None)) is None:
+            return
+        _, normalized = self._titles[key].pop(msg_id)
+        grams = self._grams[key]
+        for gram in trigrams(normalized):
+            if ids := grams.get(gram):
+                ids.discard(msg_id)
+                if not ids:
+                    del grams[gram]
+        if not self._titles[key]:
+            del self._titles[key]
+            del self._grams[key]
+        self._cache.pop(key, None)
+
+    def search(
+        self,
+        guild_id: Snowflake_Type,
+        author_id: Snowflake_Type,
+        query: str,
+        limit: int = 25,
+    ) -> list[tuple[Snowflake_Type, str]]:
+        """The best matching (message id, title) pairs for a user's open polls"""
+        key = (guild_id, author_id)
+        titles = self._titles.get(key)
+        if not titles:
+            return []
+
+        query = normalize(query)
+        if not query:
+            # nothing typed yet, newest polls first
+            return [(m, titles[m][0]) for m in heapq.nlargest(limit, titles)]
+
+        candidates = self._candidates(key, query)
+        best = [
+            candidates[i]
+            for i, _ in top_matches(query, [titles[m][1] for m in candidates], limit)
+        ]
+        if len(best) < limit:
+            # nothing else resembles the query, still offer the newest polls
+            chosen = set(best)
+            best += heapq.nlargest(
+                limit - len(best), (m for m in titles if m not in chosen)
+            )
+        return [(m, titles[m][0]) for m in best]
+
+    def _candidates(self, key: IndexKey, query: str) -> list[Snowflake_Type]:
+        now = time.monotonic()
+        titles = self._titles[key]
+
+        cached = self._cache.get(key)
+        if cached and cached.expires > now and query.startswith(cached.query):
+            candidates = [m for m in cached.candidates if m in titles]
+        elif len(titles) <= self.max_candidates:
+            candidates = list(titles)
+        else:
+            shared: dict[Snowflake_Type, int] = {}
+            grams = self._grams[key]
+            for gram in trigrams(query):
+                for msg_id in grams.get(gram, ()):
+                    shared[msg_id] = shared.get(msg_id, 0) + 1
+            candidates = heapq.nlargest(self.max_candidates, shared, key=shared.get)
+
+        if len(query) >= 3:
+            # shorter prefixes don't narrow anything down, reusing them would only lose matches
+            self._cache[key] = CachedSearch(query, candidates, now + self.cache_ttl)
+            self._expire_cache(now)
+        return candidates
+
+    def _expire_cache(self, now: float):
+        if len(self._cache) > 1000:
+            self._cache = {k: v for k, v in self._cache.items() if v.expires > now}
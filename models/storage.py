@@ -0,0 +1,666 @@
+"""
+Redis layout for polls.
+
+    poll:{guild_id}:{msg_id}    the poll record
+    poll_index:{guild_id}       set of message ids that have a poll in the guild
+    poll_guilds                 set of guild ids that have (or had) polls
+    poll_layout                 layout version, set once legacy keys have been migrated
+    poll_due                    sorted set of "{guild_id}:{msg_id}" scored by expiry time, with redis expiry on
+    poll_votes:{guild_id}:{user_id}
+                                set of message ids the user has voted on, with the vote index on
+
+In `sets` mode the record only holds the poll's metadata, each option's voters
+live in their own set so a vote is a single SADD/SREM/SMOVE:
+
+    poll_voters:{guild_id}:{msg_id}:{option_index}
+
+In `stream` mode every vote is appended to a stream as the vote's outcome, and the record is
+a snapshot written every so often with the id of the last event it includes. Loading a poll
+replays the events after its snapshot. Closed polls' streams are kept for a week as an audit trail:
+
+    poll_stream:{guild_id}:{msg_id}
+
+Polls are loaded with only each option's vote count, which is all rendering needs,
+`load_voters` fills in the voter sets when a vote has to check them. The vote index is
+only added to, ids of polls that have closed or lost the user's votes are cleared out as they're read.
+
+Older versions stored every poll as a top-level `{guild_id}|{msg_id}` key,
+`migrate_legacy` moves those into the layout above.
+
+Records are written with `models.codec`, so they're read and written through `raw`,
+a connection that doesn't decode responses. JSON records from before that still load.
+
+With a `ClientCache`, single record reads are served from memory until redis says the key changed.
+It tracks everything under `poll:`, so that's only ever records, keys written on every vote live elsewhere
+to keep votes from sending every process an invalidation.
+"""
+import asyncio
+import logging
+import struct
+import time
+from itertools import chain, zip_longest
+from typing import AsyncIterator, Iterable, Optional
+
+import aioredis
+from dis_snek.models import Snowflake_Type, to_snowflake
+
+from models import codec
+from models.emoji import emoji
+from models.poll import PollData
+from models.tracking import ClientCache
+from models.voters import VoterSet
+
+log = logging.getLogger("Janet")
+POLL_PREFIX = "poll"
+GUILDS_KEY = f"{POLL_PREFIX}_guilds"
+LAYOUT_KEY = f"{POLL_PREFIX}_layout"
+LAYOUT_VERSION = 2
+DUE_KEY = f"{POLL_PREFIX}_due"
+
+STORAGE_MODES = ("snapshot", "sets", "stream")
+MAX_OPTIONS = len(emoji)
+
+SCAN_COUNT = 1000
+MGET_SIZE = 250
+PIPELINE_DEPTH = 4
+
+# vote events kept per poll, way more than can pile up between snapshots
+STREAM_RETENTION = 10_000
+STREAM_AUDIT_TTL = 7 * 24 * 60 * 60
+# a poll that replays this many events on load gets a fresh snapshot
+COMPACT_AFTER = 100
+
+
+def poll_key(guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> str:
+    return f"{POLL_PREFIX}:{guild_id}:{msg_id}"
+
+
+def index_key(guild_id: Snowflake_Type) -> str:
+    return f"{POLL_PREFIX}_index:{guild_id}"
+
+
+def voters_key(guild_id: Snowflake_Type, msg_id: Snowflake_Type, index: int) -> str:
+    return f"{POLL_PREFIX}_voters:{guild_id}:{msg_id}:{index}"
+
+
+def stream_key(guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> str:
+    return f"{POLL_PREFIX}_stream:{guild_id}:{msg_id}"
+
+
+def votes_key(guild_id: Snowflake_Type, user_id: Snowflake_Type) -> str:
+    return f"{POLL_PREFIX}_votes:{guild_id}:{user_id}"
+
+
+def due_member(guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> str:
+    return f"{guild_id}:{msg_id}"
+
+
+def legacy_key(guild_id: Snowflake_Type, msg_id: Snowflake_Type) -> str:
+    return f"{guild_id}|{msg_id}"
+
+
+def decode_poll(poll_data) -> Optional[PollData]:
+    try:
+        return codec.decode(poll_data)[0]
+    except (TypeError, ValueError, struct.error):
+        return None
+
+
+def encode_poll(poll: PollData, voters: bool = True) -> bytes:
+    return codec.encode(poll, voters)
+
+
+# toggles ARGV[1]'s vote for the option at index ARGV[2] (1 based)
+# returns 0 if the vote was removed, 1 if it was added, or 1 + i if it was moved from option i
+VOTE_SCRIPT = """
+local target = KEYS[tonumber(ARGV[2])]
+if redis.call("SREM", target, ARGV[1]) == 1 then
+    return 0
+end
+if ARGV[3] == "1" then
+    for i, key in ipairs(KEYS) do
+        if key ~= target and redis.call("SMOVE", key, target, ARGV[1]) == 1 then
+            return 1 + i
+        end
+    end
+end
+redis.call("SADD", target, ARGV[1])
+return 1
+"""
+
+
+class PollStore:
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        raw: aioredis.Redis,
+        mode: str = "snapshot",
+        redis_expiry: bool = False,
+        cache: Optional[ClientCache] = None,
+        vote_index: bool = False,
+    ):
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown poll storage mode: {mode}")
+        self.redis = redis
+        self.raw = raw
+        self.cache = cache
+        self.mode = mode
+        self.redis_expiry = redis_expiry
+        self.vote_index = vote_index
+        self.migrated = False
+        # per poll, votes waiting to be written and a future for each that's resolved once they are
+        self._vote_writes: dict[tuple, list[tuple[list, asyncio.Future]]] = {}
+        # and the task writing them
+        self._vote_writers: dict[tuple, asyncio.Task] = {}
+        self._vote_script = redis.register_script(VOTE_SCRIPT)
+
+    @property
+    def sets(self) -> bool:
+        return self.mode == "sets"
+
+    @property
+    def streams(self) -> bool:
+        return self.mode == "stream"
+
+    async def get(
+        self, guild_id: Snowflake_Type, msg_id: Snowflake_Type
+    ) -> Optional[PollData]:
+        poll_data = await self._get(poll_key(guild_id, msg_id))
+        if poll_data is None and not self.migrated:
+            # not migrated yet, move it over while we're here
+            poll_data = await self.raw.get(legacy_key(guild_id, msg_id))
+            if poll_data is None:
+                return None
+            await self._migrate_keys([legacy_key(guild_id, msg_id)], [poll_data])
+        polls = await self._load([(guild_id, msg_id)], [poll_data])
+        return polls[0][2] if polls else None
+
+    async def save(
+        self, guild_id: Snowflake_Type, msg_id: Snowflake_Type, poll: PollData
+    ):
+        """Write the whole poll, in `sets` mode this replaces the option sets too if they're loaded"""
+        if not self.sets and not poll.voters_loaded:
+            await self.load_voters(guild_id, msg_id, poll)
+        async with self.raw.pipeline(transaction=True) as pipe:
+            self._queue_save(
+                pipe, guild_id, msg_id, encode_poll(poll, voters=not self.sets)
+            )
+            if self.sets and poll.voters_loaded:
+                self._queue_voters(pipe, guild_id, msg_id, poll)
+            self._queue_due(pipe, guild_id, msg_id, poll)
+            await pipe.execute()
+
+    async def save_many(self, polls: list[tuple[Snowflake_Type, Snowflake_Type, PollData]]):
+        """Write a batch of snapshots, in `sets` mode only the metadata is written as votes are already stored"""
+        if not self.sets:
+            for guild_id, msg_id, poll in polls:
+                if not poll.voters_loaded:
+                    await self.load_voters(guild_id, msg_id, poll)
+        # encode everything up front so each snapshot is taken without yielding to the loop
+        encoded = [(g, m, p, encode_poll(p, voters=not self.sets)) for g, m, p in polls]
+        for i in range(0, len(encoded), MGET_SIZE):
+            async with self.raw.pipeline(transaction=False) as pipe:
+                for guild_id, msg_id, poll, poll_data in encoded[i : i + MGET_SIZE]:
+                    self._queue_save(pipe, guild_id, msg_id, poll_data)
+                    self._queue_due(pipe, guild_id, msg_id, poll)
+                await pipe.execute()
+
+    async def vote(
+        self,
+        guild_id: Snowflake_Type,
+        poll: PollData,
+        opt_index: int,
+        author_id: Snowflake_Type,
+    ) -> bool:
+        """Toggle a vote in the option sets, and mirror the result onto the local poll"""
+        result = await self._vote_script(
+            keys=[
+                voters_key(guild_id, poll.message_id, i)
+                for i in range(len(poll.poll_options))
+            ],
+            args=[author_id, opt_index + 1, int(poll.single_vote)],
+        )
+        # redis is the source of truth here, another process may have voted since we loaded the poll
+        added = result != 0
+        if poll.voters_loaded:
+            if result > 1:
+                poll.apply_vote(result - 2, author_id, False)
+            poll.apply_vote(opt_index, author_id, added)
+            return added
+
+        # only the counts are in memory, the script's result says exactly how they changed
+        options = poll.poll_options
+        options[opt_index].count += 1 if added else -1
+        if result > 1:
+            options[result - 2].count -= 1
+        poll.touch()
+        return added
+
+    async def load_voters(
+        self, guild_id: Snowflake_Type, msg_id: Snowflake_Type, poll: PollData
+    ) -> bool:
+        """Fill in the voter sets of a poll loaded with only its counts, returns False if it's no longer stored"""
+        found = True
+        in_sets = self.sets
+        if not in_sets:
+            try:
+                record, carries_voters = codec.decode(await self._get(poll_key(guild_id, msg_id)))
+            except (TypeError, ValueError, struct.error):
+                record, carries_voters = None, True
+                found = False
+            # without voters it was written in sets mode, before that was turned off
+            in_sets = not carries_voters
+
+        loaded = []
+        if in_sets:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for i in range(len(poll.poll_options)):
+                    pipe.smembers(voters_key(guild_id, msg_id, i))
+                loaded = [VoterSet(int(v) for v in m) for m in await pipe.execute()]
+        elif found:
+            if self.streams:
+                events = await self.redis.xrange(
+                    stream_key(guild_id, msg_id), min=record.stream_id or "-"
+                )
+                self._replay(record, events)
+            loaded = [o.voters for o in record.poll_options]
+
+        for option, voters in zip_longest(poll.poll_options, loaded):
+            # it may have been loaded by someone else while we waited
+            if option is not None and option.voters is None:
+                option.voters = voters if voters is not None else VoterSet()
+        return found
+
+    async def load_counts(self, guild_id: Snowflake_Type, poll: PollData):
+        """Refresh the counts of a `sets` mode poll without loaded voters, after someone else voted"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for i in range(len(poll.poll_options)):
+                pipe.scard(voters_key(guild_id, poll.message_id, i))
+            counts = await pipe.execute()
+        for option, count in zip(poll.poll_options, counts):
+            if option.voters is None:
+                option.count = count
+        poll.touch()
+
+    async def find_votes(
+        self, guild_id: Snowflake_Type, author_id: Snowflake_Type, msg_ids: list[Snowflake_Type]
+    ) -> list[tuple[Optional[PollData], list[int]]]:
+        """
+        The options a user has voted for on each of these polls, read from redis in one go.
+
+        The polls are only decoded to check, they aren't cached and their voters aren't kept.
+        A poll that's no longer stored comes back as None.
+        """
+        polls = []
+        for poll_data in await self._mget([poll_key(guild_id, m) for m in msg_ids]):
+            try:
+                polls.append(codec.decode(poll_data))
+            except (TypeError, ValueError, struct.error):
+                polls.append((None, False))
+
+        separate = [(m, p) for m, (p, carries_voters) in zip(msg_ids, polls) if p and not carries_voters]
+        in_records = [(m, p) for m, (p, carries_voters) in zip(msg_ids, polls) if p and carries_voters]
+        votes = {}
+        if separate:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for msg_id, poll in separate:
+                    for i in range(len(poll.poll_options)):
+                        pipe.sismember(voters_key(guild_id, msg_id, i), author_id)
+                voted = iter(await pipe.execute())
+            for msg_id, poll in separate:
+                votes[msg_id] = [i for i in range(len(poll.poll_options)) if next(voted)]
+        if self.streams and in_records:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for msg_id, poll in in_records:
+                    pipe.xrange(stream_key(guild_id, msg_id), min=poll.stream_id or "-")
+                for (msg_id, poll), events in zip(in_records, await pipe.execute()):
+                    self._replay(poll, events)
+        for msg_id, poll in in_records:
+            votes[msg_id] = poll.votes_of(author_id)
+        return [(poll, votes.get(msg_id, [])) for msg_id, (poll, _) in zip(msg_ids, polls)]
+
+    async def voted_polls(
+        self, guild_id: Snowflake_Type, author_id: Snowflake_Type
+    ) -> set[Snowflake_Type]:
+        """The polls a user may have votes on, from the vote index"""
+        return {to_snowflake(m) for m in await self.redis.smembers(votes_key(guild_id, author_id))}
+
+    async def unindex_votes(
+        self, guild_id: Snowflake_Type, author_id: Snowflake_Type, msg_ids: list[Snowflake_Type]
+    ):
+        if msg_ids:
+            await self.redis.srem(votes_key(guild_id, author_id), *msg_ids)
+
+    def record_vote(
+        self,
+        guild_id: Snowflake_Type,
+        poll: PollData,
+        opt_index: int,
+        author_id: Snowflake_Type,
+        added: bool,
+        voted: Optional[bool] = None,
+    ) -> Optional[asyncio.Future]:
+        """
+        Queue the writes for a vote that's been applied to the local poll, in `stream` mode that's its event,
+        and with the vote index on whether the user has any votes left on it (`voted`, None if unknown).
+
+        Call it while still holding the poll's lock, writes for a poll go out in the order they're recorded,
+        then await the returned future outside it. Votes recorded while a write is in flight go out together.
+        """
+        writes = []
+        if self.streams:
+            writes.append(
+                ("xadd", stream_key(guild_id, poll.message_id),
+                 {"user": int(author_id), "option": opt_index, "added": int(added)})
+            )
+        if self.vote_index and voted is not None:
+            writes.append(("sadd" if voted else "srem", votes_key(guild_id, author_id), poll.message_id))
+        if not writes:
+            return None
+
+        key = (guild_id, poll.message_id)
+        written = asyncio.get_running_loop().create_future()
+        if (queue := self._vote_writes.get(key)) is None:
+            queue = self._vote_writes[key] = []
+            self._vote_writers[key] = asyncio.create_task(self._write_votes(key, poll, queue))
+        queue.append((writes, written))
+        return written
+
+    async def _write_votes(self, key: tuple, poll: PollData, queue: list):
+        try:
+            while queue:
+                batch = queue[:]
+                del queue[:]
+                try:
+                    # sent down one connection, so redis applies them in the order they were recorded
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        for writes, _ in batch:
+                            for command, *args in writes:
+                                getattr(pipe, command)(*args)
+                        results = iter(await pipe.execute())
+                    for writes, _ in batch:
+                        for (command, *_), result in zip(writes, results):
+                            if command == "xadd":
+                                poll.stream_id = result
+                except Exception as e:
+                    # the votes are still in memory, the next snapshot has them
+                    log.error(f"Failed to write {len(batch)} votes for poll {key[1]}: {e}")
+                for _, written in batch:
+                    written.set_result(None)
+        finally:
+            self._vote_writes.pop(key, None)
+            self._vote_writers.pop(key, None)
+
+    async def votes_written(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        """Wait for a poll's recorded votes to be written, hold its lock so no more are recorded meanwhile"""
+        if (writer := self._vote_writers.get((guild_id, msg_id))) is not None:
+            await asyncio.shield(writer)
+
+    async def remove_option(
+        self, guild_id: Snowflake_Type, msg_id: Snowflake_Type, index: int, poll: PollData
+    ):
+        """Shift the option sets after a removed option down by one"""
+        if self.streams:
+            # events logged after this use the new indexes, the snapshot has to mark where they start,
+            # so it has to come after the events still being logged with the old ones
+            await self.votes_written(guild_id, msg_id)
+            await self.save(guild_id, msg_id, poll)
+            return
+        if not self.sets:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(voters_key(guild_id, msg_id, index))
+            for i in range(index + 1, MAX_OPTIONS):
+                # SUNIONSTORE of a missing key just clears the destination
+                pipe.sunionstore(
+                    voters_key(guild_id, msg_id, i - 1), voters_key(guild_id, msg_id, i)
+                )
+            pipe.delete(voters_key(guild_id, msg_id, MAX_OPTIONS - 1))
+            await pipe.execute()
+
+    async def delete(self, guild_id: Snowflake_Type, msg_id: Snowflake_Type):
+        await self.delete_many([(guild_id, msg_id)])
+
+    async def delete_many(self, polls: list[tuple[Snowflake_Type, Snowflake_Type]]):
+        """Delete a batch of polls, a pipelined transaction per `MGET_SIZE` polls"""
+        for i in range(0, len(polls), MGET_SIZE):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for guild_id, msg_id in polls[i : i + MGET_SIZE]:
+                    if self.cache is not None:
+                        self.cache.discard(poll_key(guild_id, msg_id))
+                    pipe.delete(
+                        poll_key(guild_id, msg_id),
+                        legacy_key(guild_id, msg_id),
+                        *(voters_key(guild_id, msg_id, i) for i in range(MAX_OPTIONS)),
+                    )
+                    pipe.srem(index_key(guild_id), msg_id)
+                    pipe.zrem(DUE_KEY, due_member(guild_id, msg_id))
+                    pipe.expire(stream_key(guild_id, msg_id), STREAM_AUDIT_TTL)
+                await pipe.execute()
+
+    async def schedule_expiry(
+        self, polls: list[tuple[Snowflake_Type, Snowflake_Type, PollData]]
+    ):
+        """Make sure timed polls are in the due queue, for polls saved before redis expiry was turned on"""
+        if not self.redis_expiry:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for guild_id, msg_id, poll in polls:
+                self._queue_due(pipe, guild_id, msg_id, poll, nx=True)
+            await pipe.execute()
+
+    async def claim_due(
+        self,
+        now: Optional[float] = None,
+        limit: int = 500,
+        local: Iterable[tuple[Snowflake_Type, Snowflake_Type]] = (),
+    ) -> list[tuple[Snowflake_Type, Snowflake_Type]]:
+        """
+        Take the polls that have expired off the due queue, up to `limit` plus any in `local`,
+        the polls this process already knows are due.
+
+        Each poll is only handed to the first process to remove it, so several bots can share the queue.
+        """
+        now = time.time() if now is None else now
+        members = await self.redis.zrangebyscore(DUE_KEY, "-inf", now, start=0, num=limit)
+        members = list(dict.fromkeys(chain(members, (due_member(g, m) for g, m in local))))
+        if not members:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member in members:
+                pipe.zrem(DUE_KEY, member)
+            removed = await pipe.execute()
+
+        claimed = []
+        for member, ours in zip(members, removed):
+            if ours:
+                guild_id, msg_id = member.split(":")
+                claimed.append((to_snowflake(guild_id), to_snowflake(msg_id)))
+        return claimed
+
+    async def next_due(self) -> Optional[float]:
+        due = await self.redis.zrange(DUE_KEY, 0, 0, withscores=True)
+        return due[0][1] if due else None
+
+    async def poll_ids(self, guild_id: Snowflake_Type) -> set[Snowflake_Type]:
+        return {to_snowflake(m) for m in await self.redis.smembers(index_key(guild_id))}
+
+    async def iter_polls(
+        self,
+    ) -> AsyncIterator[list[tuple[Snowflake_Type, Snowflake_Type, PollData]]]:
+        """Stream every stored poll in batches, walking the guild indexes instead of the keyspace"""
+        batch = []
+        async for guild_id in self.redis.sscan_iter(GUILDS_KEY, count=SCAN_COUNT):
+            async for msg_id in self.redis.sscan_iter(
+                index_key(guild_id), count=SCAN_COUNT
+            ):
+                batch.append((to_snowflake(guild_id), to_snowflake(msg_id)))
+                if len(batch) >= MGET_SIZE * PIPELINE_DEPTH:
+                    yield await self._fetch([poll_key(g, m) for g, m in batch], batch)
+                    batch = []
+        if batch:
+            yield await self._fetch([poll_key(g, m) for g, m in batch], batch)
+
+        self.migrated = await self.redis.get(LAYOUT_KEY) == str(LAYOUT_VERSION)
+        if not self.migrated:
+            # legacy keys that haven't been migrated yet still need serving
+            async for ids, keys in self._scan_legacy():
+                yield await self._fetch(keys, ids)
+
+    async def migrate_legacy(self) -> AsyncIterator[int]:
+        """Move legacy `guild|msg` keys into the namespaced layout, yielding the running total"""
+        migrated = 0
+        passed = -1
+        # keep passing until nothing moves, old processes may still be writing legacy keys
+        while passed != migrated:
+            passed = migrated
+            async for _, keys in self._scan_legacy():
+                values = await self._mget(keys)
+                migrated += await self._migrate_keys(keys, values)
+                yield migrated
+        await self.redis.set(LAYOUT_KEY, LAYOUT_VERSION)
+        self.migrated = True
+
+    async def _scan_legacy(self):
+        keys = []
+        async for key in self.redis.scan_iter(match="*|*", count=SCAN_COUNT):
+            keys.append(key)
+            if len(keys) >= MGET_SIZE * PIPELINE_DEPTH:
+                yield self._parse_legacy(keys), keys
+                keys = []
+        if keys:
+            yield self._parse_legacy(keys), keys
+
+    @staticmethod
+    def _parse_legacy(keys: list[str]) -> list[Optional[tuple]]:
+        ids = []
+        for key in keys:
+            try:
+                guild_id, msg_id = [to_snowflake(k) for k in key.split("|")]
+                ids.append((guild_id, msg_id))
+            except ValueError:
+                ids.append(None)
+        return ids
+
+    async def _migrate_keys(self, keys: list[str], values: list) -> int:
+        migrated = 0
+        async with self.raw.pipeline(transaction=False) as pipe:
+            for key, ids, poll_data in zip(keys, self._parse_legacy(keys), values):
+                if ids is None or decode_poll(poll_data) is None:
+                    continue
+                # SETNX so a poll that was written in the new layout mid-migration is kept
+                self._queue_save(pipe, *ids, poll_data, nx=True)
+                pipe.delete(key)
+                migrated += 1
+            await pipe.execute()
+        return migrated
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        if self.cache is None:
+            return await self.raw.get(key)
+        if (poll_data := self.cache.get(key)) is not None:
+            return poll_data
+        poll_data = None
+        self.cache.begin_read(key)
+        try:
+            poll_data = await self.raw.get(key)
+        finally:
+            self.cache.put(key, poll_data)
+        return poll_data
+
+    async def _mget(self, keys: list[str]) -> list:
+        async with self.raw.pipeline(transaction=False) as pipe:
+            for i in range(0, len(keys), MGET_SIZE):
+                pipe.mget(keys[i : i + MGET_SIZE])
+            return [v for chunk in await pipe.execute() for v in chunk]
+
+    async def _fetch(self, keys: list[str], ids: list) -> list:
+        return await self._load(ids, await self._mget(keys))
+
+    async def _load(self, ids: list, values: list) -> list:
+        """Decode records into polls with only their vote counts loaded"""
+        polls = []
+        records = []
+        separate = []
+        for key_ids, poll_data in zip(ids, values):
+            if key_ids is None:
+                continue
+            try:
+                poll, carries_voters = codec.decode(poll_data, voters=False)
+            except (TypeError, ValueError, struct.error):
+                continue
+            polls.append((*key_ids, poll))
+            if not carries_voters:
+                separate.append(polls[-1])
+            elif self.sets:
+                # written before sets mode was turned on, move its voters out
+                await self.save(*key_ids, codec.decode(poll_data)[0])
+                separate.append(polls[-1])
+            records.append(poll_data)
+
+        if separate:
+            # the record's counts are only as fresh as its last snapshot, the sets are always current
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for guild_id, msg_id, poll in separate:
+                    for i in range(len(poll.poll_options)):
+                        pipe.scard(voters_key(guild_id, msg_id, i))
+                counts = iter(await pipe.execute())
+            for _, _, poll in separate:
+                for option in poll.poll_options:
+                    option.voters = None
+                    option.count = next(counts)
+
+        if self.streams and polls:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for guild_id, msg_id, poll in polls:
+                    pipe.xrange(stream_key(guild_id, msg_id), min=poll.stream_id or "-")
+                streams = await pipe.execute()
+            for i, events in enumerate(streams):
+                guild_id, msg_id, poll = polls[i]
+                if not any(event_id != poll.stream_id for event_id, _ in events):
+                    continue
+                # replaying needs the voters, polls with votes since their snapshot are active anyway
+                poll = codec.decode(records[i])[0]
+                polls[i] = (guild_id, msg_id, poll)
+                if self._replay(poll, events) >= COMPACT_AFTER:
+                    await self.save(guild_id, msg_id, poll)
+        return polls
+
+    @staticmethod
+    def _replay(poll: PollData, events: list) -> int:
+        """Apply the vote events after a poll's snapshot, returns how many there were"""
+        replayed = 0
+        for event_id, event in events:
+            if event_id == poll.stream_id:
+                # xrange's start is inclusive, the snapshot already has this one
+                continue
+            poll.apply_vote(int(event["option"]), int(event["user"]), event["added"] == "1")
+            poll.stream_id = event_id
+            replayed += 1
+        return replayed
+
+    @staticmethod
+    def _queue_voters(pipe, guild_id, msg_id, poll: PollData):
+        for i in range(MAX_OPTIONS):
+            pipe.delete(voters_key(guild_id, msg_id, i))
+        for i, option in enumerate(poll.poll_options):
+            if option.voters:
+                pipe.sadd(voters_key(guild_id, msg_id, i), *option.voters)
+
+    def _queue_due(self, pipe, guild_id, msg_id, poll: PollData, nx: bool = False):
+        if self.redis_expiry and poll.expire_time and not poll._expired:
+            pipe.zadd(
+                DUE_KEY,
+                {due_member(guild_id, msg_id): poll.expire_time.timestamp()},
+                nx=nx,
+            )
+
+    def _queue_save(self, pipe, guild_id, msg_id, poll_data, nx: bool = False):
+        if self.cache is not None:
+            # redis will invalidate it too, this stops our own reads in the meantime seeing the old value
+            self.cache.discard(poll_key(guild_id, msg_id))
+        pipe.set(poll_key(guild_id, msg_id), poll_data, nx=nx)
+        if self.streams:
+            pipe.xtrim(stream_key(guild_id, msg_id), STREAM_RETENTION, approximate=True)
+        pipe.sadd(index_key(guild_id), msg_id)
+        pipe.sadd(GUILDS_KEY, guild_id)
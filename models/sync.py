@@ -0,0 +1,127 @@
+"""
+Keeps poll state coherent between bot processes sharing one redis.
+
+    poll_events     pub/sub channel every process publishes its poll mutations on
+    poll_instances  sorted set of live process ids, scored by their last heartbeat
+
+Peers patch their local copy of a poll from these events rather than reloading it,
+a vote may not have been flushed to redis yet when its event arrives.
+
+Each guild's poll messages are edited by one process, picked by rendezvous hashing over the
+live processes, so when one goes away only its guilds move.
+"""
+import asyncio
+import logging
+import time
+import uuid
+import zlib
+from typing import Awaitable, Callable
+
+import aioredis
+import orjson
+from dis_snek.models import Snowflake_Type
+
+log = logging.getLogger("Janet")
+
+EVENTS_CHANNEL = "poll_events"
+INSTANCES_KEY = "poll_instances"
+
+
+class PollSync:
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        handler: Callable[[dict], Awaitable],
+        heartbeat: float = 5,
+    ):
+        self.redis = redis
+        self.handler = handler
+        self.heartbeat = heartbeat
+        self.instance_id = uuid.uuid4().hex
+        self.instances: list[str] = [self.instance_id]
+
+        self._outbox: asyncio.Queue[dict] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+        self.published = 0
+        self.received = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._beat()),
+                asyncio.create_task(self._publish()),
+                asyncio.create_task(self._listen()),
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.redis.zrem(INSTANCES_KEY, self.instance_id)
+
+    def owner(self, guild_id: Snowflake_Type) -> str:
+        """The process that edits this guild's polls"""
+        guild = str(guild_id).encode()
+        return max(self.instances, key=lambda i: zlib.crc32(guild, zlib.crc32(i.encode())))
+
+    def owns(self, guild_id: Snowflake_Type) -> bool:
+        return self.owner(guild_id) == self.instance_id
+
+    def publish(self, op: str, guild_id: Snowflake_Type, msg_id: Snowflake_Type, **data):
+        """Queue an event for the other processes, events are sent in the order they're published"""
+        self._outbox.put_nowait(
+            {"op": op, "src": self.instance_id, "guild": int(guild_id), "msg": int(msg_id), **data}
+        )
+
+    async def refresh_instances(self):
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(INSTANCES_KEY, {self.instance_id: now})
+            pipe.zremrangebyscore(INSTANCES_KEY, "-inf", now - self.heartbeat * 3)
+            pipe.zrange(INSTANCES_KEY, 0, -1)
+            *_, instances = await pipe.execute()
+
+        instances = sorted(instances)
+        if instances != self.instances:
+            log.info(f"Poll processes changed: {len(instances)} live")
+            self.instances = instances
+
+    async def _beat(self):
+        while True:
+            try:
+                await self.refresh_instances()
+            except Exception as e:
+                log.error(f"Poll heartbeat failed: {e}")
+            await asyncio.sleep(self.heartbeat)
+
+    async def _publish(self):
+        while True:
+            event = await self._outbox.get()
+            try:
+                await self.redis.publish(EVENTS_CHANNEL, orjson.dumps(event))
+                self.published += 1
+            except Exception as e:
+                log.error(f"Failed to publish poll event {event['op']}: {e}")
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    event = orjson.loads(message["data"])
+                    if event["src"] == self.instance_id:
+                        continue
+                    self.received += 1
+                    try:
+                        await self.handler(event)
+                    except Exception as e:
+                        log.error(f"Failed to apply poll event {event['op']}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Lost poll event subscription: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
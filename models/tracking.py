@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import aioredis
+
+log = logging.getLogger("Janet")
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+class ClientCache:
+    """
+    Redis values cached in memory, kept fresh by redis' client side caching.
+
+    A dedicated connection turns on `CLIENT TRACKING` in broadcast mode for `prefix`, redirected to itself,
+    and subscribes to the invalidation channel, so redis tells us whenever a key under the prefix changes,
+    whoever wrote it. That works over RESP2, which is all aioredis speaks.
+
+    A value read while an invalidation arrived may already be stale, so it isn't cached.
+    While the tracking connection is down nothing is served from the cache.
+    """
+
+    def __init__(self, redis: aioredis.Redis, prefix: str, max_size: int = 5000):
+        self.redis = redis
+        self.prefix = prefix
+        self.max_size = max_size
+
+        self._values: OrderedDict[str, bytes] = OrderedDict()
+        # keys being read from redis, and those invalidated mid-read whose result mustn't be cached
+        self._reading: dict[str, int] = {}
+        self._stale: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def active(self) -> bool:
+        return self._ready.is_set()
+
+    async def start(self, timeout: float = 5):
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self._ready.clear()
+        self.clear()
+
+    def get(self, key: str) -> Optional[bytes]:
+        if self.active and (value := self._values.get(key)) is not None:
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def begin_read(self, key: str):
+        """Call before reading a key from redis, then pass what was read to `put`"""
+        self._reading[key] = self._reading.get(key, 0) + 1
+
+    def put(self, key: str, value: Optional[bytes]):
+        if (readers := self._reading.pop(key, 1) - 1) > 0:
+            self._reading[key] = readers
+        if key in self._stale:
+            if not readers:
+                self._stale.discard(key)
+            return
+        if value is None or not self.active:
+            return
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    def discard(self, key: str):
+        self._values.pop(key, None)
+        if key in self._reading:
+            self._stale.add(key)
+
+    def clear(self):
+        self._values.clear()
+        self._stale.update(self._reading)
+
+    async def _command(self, conn, *args):
+        await conn.send_command(*args)
+        return await conn.read_response()
+
+    async def _run(self):
+        while True:
+            conn = self.redis.connection_pool.make_connection()
+            try:
+                await conn.connect()
+                client_id = await self._command(conn, "CLIENT", "ID")
+                await self._command(
+                    conn, "CLIENT", "TRACKING", "ON",
+                    "REDIRECT", client_id, "BCAST", "PREFIX", self.prefix,
+                )
+                await self._command(conn, "SUBSCRIBE", INVALIDATE_CHANNEL)
+                # anything cached before now may have missed its invalidation
+                self.clear()
+                self._ready.set()
+                log.info(f"Client side caching enabled for {self.prefix}*")
+
+                while True:
+                    kind, _, keys = await conn.read_response()
+                    if kind not in ("message", b"message"):
+                        continue
+                    self.invalidations += 1
+                    if keys is None:
+                        # FLUSHDB/FLUSHALL
+                        self.clear()
+                        continue
+                    for key in keys:
+                        self.discard(key if isinstance(key, str) else key.decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Client side caching connection lost: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._ready.clear()
+                await conn.disconnect()
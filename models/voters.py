@@ -0,0 +1,190 @@
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from typing import Iterable, Union
+
+
+class VoterSet:
+    """
+    A set of user ids packed into a sorted uint64 array, 8 bytes a voter instead of a python int in a hash table.
+
+    New votes land in a small regular set and are merged into the array once it fills,
+    so a burst of votes doesn't shift the array on every click.
+    """
+
+    __slots__ = ("_ids", "_recent")
+    __hash__ = None
+
+    MERGE_AT = 64
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._ids = array("Q", sorted({int(i) for i in ids}))
+        self._recent: set[int] = set()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "VoterSet":
+        """Load the output of `bytes(voter_set)`, which is already sorted and unique"""
+        new = cls()
+        new._ids.frombytes(data)
+        return new
+
+    @classmethod
+    def convert(cls, value: Union["VoterSet", bytes, Iterable[int]]) -> "VoterSet":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(value)
+        return cls(value)
+
+    def _index(self, user_id: int) -> int:
+        i = bisect_left(self._ids, user_id)
+        if i < len(self._ids) and self._ids[i] == user_id:
+            return i
+        return -1
+
+    def _merge(self):
+        for user_id in sorted(self._recent):
+            self._ids.insert(bisect_left(self._ids, user_id), user_id)
+        self._recent.clear()
+
+    def __contains__(self, user_id) -> bool:
+        user_id = int(user_id)
+        return user_id in self._recent or self._index(user_id) != -1
+
+    def add(self, user_id):
+        user_id = int(user_id)
+        if user_id not in self:
+            self._recent.add(user_id)
+            if len(self._recent) >= self.MERGE_AT:
+                self._merge()
+
+    def remove(self, user_id):
+        user_id = int(user_id)
+        if user_id in self._recent:
+            self._recent.remove(user_id)
+            return
+        i = self._index(user_id)
+        if i == -1:
+            raise KeyError(user_id)
+        del self._ids[i]
+
+    def discard(self, user_id):
+        try:
+            self.remove(user_id)
+        except KeyError:
+            pass
+
+    def to_list(self) -> list[int]:
+        self._merge()
+        return self._ids.tolist()
+
+    def copy(self) -> "VoterSet":
+        new = VoterSet()
+        new._ids = array("Q", self._ids)
+        new._recent = set(self._recent)
+        return new
+
+    def __copy__(self) -> "VoterSet":
+        return self.copy()
+
+    def __deepcopy__(self, memo) -> "VoterSet":
+        return self.copy()
+
+    def __bytes__(self) -> bytes:
+        self._merge()
+        return self._ids.tobytes()
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._recent)
+
+    def __iter__(self):
+        return chain(self._ids, self._recent)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, VoterSet):
+            return self.to_list() == other.to_list()
+        if isinstance(other, (set, frozenset)):
+            return len(self) == len(other) and all(int(i) in self for i in other)
+        return NotImplemented
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self._ids.__sizeof__() + self._recent.__sizeof__()
+
+    def __repr__(self) -> str:
+        return f"VoterSet({len(self)} voters)"
+
+
+class VoteIndex:
+    """
+    Which options each user has voted for, as a bitmask per user id.
+
+    Packed the same way as `VoterSet`, a sorted uint64 array of ids with a parallel uint32 array of masks,
+    about 12 bytes a voter. Users that have no votes left keep a zero mask.
+    """
+
+    __slots__ = ("_ids", "_masks", "_recent")
+
+    MERGE_AT = 64
+
+    def __init__(self, masks: dict[int, int] = None):
+        masks = masks or {}
+        ids = sorted(u for u, m in masks.items() if m)
+        self._ids = array("Q", ids)
+        self._masks = array("I", (masks[u] for u in ids))
+        self._recent: dict[int, int] = {}
+
+    @classmethod
+    def from_options(cls, options: Iterable[Iterable[int]]) -> "VoteIndex":
+        masks: dict[int, int] = {}
+        for i, voters in enumerate(options):
+            bit = 1 << i
+            for user_id in voters:
+                masks[user_id] = masks.get(user_id, 0) | bit
+        return cls(masks)
+
+    def _index(self, user_id: int) -> int:
+        i = bisect_left(self._ids, user_id)
+        if i < len(self._ids) and self._ids[i] == user_id:
+            return i
+        return -1
+
+    def get(self, user_id) -> int:
+        user_id = int(user_id)
+        if user_id in self._recent:
+            return self._recent[user_id]
+        i = self._index(user_id)
+        return self._masks[i] if i != -1 else 0
+
+    def options(self, user_id) -> list[int]:
+        mask = self.get(user_id)
+        return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+    def set(self, user_id, mask: int):
+        user_id = int(user_id)
+        i = self._index(user_id)
+        if i != -1:
+            self._masks[i] = mask
+            return
+        self._recent[user_id] = mask
+        if len(self._recent) >= self.MERGE_AT:
+            self._merge()
+
+    def _merge(self):
+        # users only get into `_recent` if they aren't in the arrays, so these are all inserts
+        for user_id in sorted(self._recent):
+            if mask := self._recent[user_id]:
+                i = bisect_left(self._ids, user_id)
+                self._ids.insert(i, user_id)
+                self._masks.insert(i, mask)
+        self._recent.clear()
+
+    def __len__(self) -> int:
+        return sum(1 for m in self._masks if m) + sum(1 for m in self._recent.values() if m)
+
+    def __sizeof__(self) -> int:
+        return (
+            object.__sizeof__(self)
+            + self._ids.__sizeof__()
+            + self._masks.__sizeof__()
+            + self._recent.__sizeof__()
+        )
@@ -145,6 +145,85 @@ class DebugCommands(Scale):
             else:
                 e.description += f"\n`{cache}`: {len(val)} / ∞ (no_expire)"
 
+        polls = self.bot.polls
+        loaded = sum(polls.peek(*key).voters_loaded for key in polls)
+        e.description += (
+            f"\n`poll_cache`: {len(polls)} / {polls.max_size} idle:`{polls.idle_ttl}`s"
+            f"\n  hits: `{polls.hits}` misses: `{polls.misses}` evictions: `{polls.evictions}`"
+            f"\n  voters loaded: `{loaded}` (the rest only have counts)"
+            f"\n`poll_messages`: {len(self.bot.poll_messages)} pinned "
+            f"({'on' if self.bot.poll_messages.pin else 'off'}) edits: `{self.bot.poll_messages.edits}`"
+        )
+        if self.bot.store and (tracked := self.bot.store.cache) is not None:
+            lookups = tracked.hits + tracked.misses
+            e.description += (
+                f"\n`poll_records`: {len(tracked)} / {tracked.max_size} "
+                f"({'tracking' if tracked.active else 'disconnected'})"
+                f"\n  hit rate: `{tracked.hits / lookups if lookups else 0:.1%}` "
+                f"invalidations: `{tracked.invalidations}`"
+            )
+
+        await ctx.send(embeds=[e])
+
+    @debug_info.subcommand(
+        "polls", sub_cmd_description="Get information about poll processing"
+    )
+    async def poll_info(self, ctx: InteractionContext):
+        await ctx.defer()
+        e = self.D_Embed("Polls")
+
+        scheduler = self.bot.edit_scheduler
+        e.add_field(
+            "Edit Scheduler",
+            f"Queue depth: `{scheduler.queue_depth}`\n"
+            f"In flight: `{scheduler.in_flight}` / `{scheduler.workers}`\n"
+            f"Edits: `{scheduler.edits}` ({scheduler.failures} failed)\n"
+            f"Edit lag: `{scheduler.average_lag:.2f}`s avg, `{scheduler.max_lag:.2f}`s max",
+        )
+        e.add_field("Unsaved Polls", str(len(self.bot.dirty_polls)))
+        if sync := self.bot.sync:
+            owned = sum(sync.owns(g.id) for g in self.bot.guilds)
+            e.add_field(
+                "Process Sync",
+                f"Processes: `{len(sync.instances)}` (this is `{sync.instance_id[:8]}`)\n"
+                f"Owned guilds: `{owned}` / `{len(self.bot.guilds)}`\n"
+                f"Events: `{sync.published}` sent, `{sync.received}` received",
+            )
+        if leader := self.bot.leader:
+            e.add_field(
+                "Jobs Lease",
+                f"Leader: `{'this process' if leader.is_leader else 'another process'}` "
+                f"(this is `{leader.instance_id[:8]}`)\n"
+                f"Times elected: `{leader.elections}`",
+            )
+        admission = self.bot.admission
+        busiest = "".join(
+            f"\n`{guild_id}`: `{len(q.waiting)}` queued, `{q.running}` running, "
+            f"wait `{q.average_wait:.2f}`s avg `{q.max_wait:.2f}`s max"
+            for guild_id, q in admission.guild_stats()[:5]
+        )
+        e.add_field(
+            "Admission",
+            f"Running: `{admission.running}` / `{admission.max_running}` "
+            f"(`{admission.per_guild}` per guild)\n"
+            f"Waiting: `{admission.waiting}`\n"
+            f"Admitted: `{admission.admitted}` ({admission.queued} queued, {admission.timeouts} timed out)"
+            + busiest,
+        )
+        poll_filter = self.bot.poll_filter
+        e.add_field(
+            "Poll ID Filter",
+            f"Ids: `{len(poll_filter)}` / `{poll_filter.capacity}` "
+            f"({poll_filter.size // 1024} KiB, {'ready' if self.bot.poll_filter_ready else 'warming up'})",
+        )
+        authors = self.bot.authors
+        e.add_field(
+            "Author Cache",
+            f"Cached: `{len(authors)}` / `{authors.max_size}`\n"
+            f"Hits: `{authors.hits}` Misses: `{authors.misses}`\n"
+            f"Member chunk requests: `{authors.chunk_requests}`",
+        )
+
         await ctx.send(embeds=[e])
 
     @debug_info.subcommand(
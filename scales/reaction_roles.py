@@ -5,11 +5,12 @@ from dis_snek.models import (
     Scale
 )
 import numpy as np
-import Levenshtein as lv
+
+from models.search import scores
 
 
 def jaro(roles, dist, string):
-    return map(lambda x: x<dist, map(lambda x: lv.jaro_winkler(string, x), roles))
+    return map(lambda x: x<dist, scores(string, roles, scorer="jaro_winkler"))
 
 
 class ReactionRoles(Scale):
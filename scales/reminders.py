@@ -160,6 +160,8 @@ class Reminders(Scale):
 
     @Task.create(IntervalTrigger(seconds=5))
     async def check_reminders(self):
+        if not self.bot.is_leader():
+            return
         now = str(datetime.now().timestamp()).split(".")
         now = int(now[0])
         client = motor.motor_asyncio.AsyncIOMotorClient(
@@ -13,6 +13,8 @@ class UpdatingChannels(Scale):
 
     @Task.create(IntervalTrigger(minutes=5))
     async def bored_channels(self):
+        if not self.bot.is_leader():
+            return
         if "nt" not in os.name:  # don't update channels if running as dev bot
             amount_total_members = 0
             amount_total_bots = 0